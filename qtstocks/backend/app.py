@@ -2,28 +2,13 @@ from flask import Flask, current_app, render_template, jsonify, request, Respons
 from flask_login import login_user, login_required, logout_user, current_user, LoginManager
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_restx import Api, Resource, fields, Namespace
-import pandas as pd
-import plotly
-import plotly.express as px
-import json
-import threading
-import queue
 from datetime import datetime, timedelta, timezone
-import io
-from plotly.subplots import make_subplots
-import plotly.graph_objects as go
-from models import User, Stock, StockStats, UserSettings, user_stock_stats
+from models import User
 from config import Config
-import requests
-from bs4 import BeautifulSoup
-from services.get_stock_lists import get_stock_list
 from extensions import db, login_manager, cors, init_extensions, ma, migrate
 import os
 import jwt as PyJWT
 from functools import wraps
-from oauthlib.oauth2 import WebApplicationClient
-from services.get_stock_data import process_stock_list
-import csv
 from controllers.auth import init_auth_routes
 from controllers.settings import init_settings_routes
 from controllers.stocks import init_stock_routes
@@ -34,15 +19,57 @@ from controllers.subscriptions import init_subscription_routes
 from controllers.products import init_product_routes
 from controllers.roles import init_role_routes
 from utils.auth import token_required
+from services.metrics import metrics_response
+from services.autocomplete import suggestions
+from services.events import broker
+
+# The scraping (Selenium, pandas) and reporting (plotly, matplotlib, reportlab)
+# stacks are imported where they are first used, so workers and migrations boot fast.
+
+# 'web' is the full API; 'cli' only sets up db and migrate for migrations and batch scripts
+APP_PROFILES = ('web', 'cli')
+
+def create_app(config_class=Config, profile=None):
+    """Build the Flask app.
+
+    ``profile`` defaults to the APP_PROFILE environment variable, then 'web'.
+    The 'cli' profile skips routes, Swagger, OAuth, the snapshot scheduler and
+    admin seeding, e.g. ``APP_PROFILE=cli flask db upgrade``.
+    """
+    profile = profile or os.getenv('APP_PROFILE', 'web')
+    if profile not in APP_PROFILES:
+        raise ValueError(f"Unknown app profile {profile}, expected one of: {', '.join(APP_PROFILES)}")
 
-def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
     
     # Initialize extensions
     db.init_app(app)
-    ma.init_app(app)
     migrate.init_app(app, db)
+    # Events go through Postgres so streams in any worker see them, CLI snapshots included
+    broker.init_app(app)
+    
+    @app.cli.command('snapshot-stats')
+    def snapshot_stats_command():
+        """Refresh stale stats for every stock in one batched pass."""
+        from services.snapshot import run_snapshot_exclusively
+        run_snapshot_exclusively()
+    
+    @app.cli.command('compact-stats-history')
+    def compact_stats_history_command():
+        """Collapse stats history older than STATS_HISTORY_RAW_DAYS to one row per day.
+
+        Also prunes stock change log entries older than STOCK_CHANGES_RETENTION_DAYS.
+        """
+        from services.stats_history import compact_history
+        from services.stock_changes import prune_changes
+        compact_history()
+        prune_changes()
+    
+    if profile == 'cli':
+        return app
+    
+    ma.init_app(app)
     
     # Initialize Swagger
     api = Api(app, version='1.0', title='QT Stocks API',
@@ -84,10 +111,8 @@ def create_app(config_class=Config):
         "supports_credentials": True
     }})
     
-    # Queue for SSE messages
-    message_queue = queue.Queue()
-    
     # OAuth 2 client setup
+    from oauthlib.oauth2 import WebApplicationClient
     client = WebApplicationClient(app.config['GOOGLE_CLIENT_ID'])
     
     @login_manager.user_loader
@@ -105,6 +130,19 @@ def create_app(config_class=Config):
     init_product_routes(app, token_required, products_ns)
     init_role_routes(app, token_required, roles_ns)
     
+    # Prometheus scrape endpoint, outside the Swagger API
+    @app.route('/metrics')
+    def metrics():
+        return metrics_response()
+    
+    # Build the stock picker's autocomplete index without holding up startup
+    suggestions.reload(app)
+    
+    # Periodic market-wide stats refresh, one process at a time via a pg advisory lock
+    if Config.STATS_SNAPSHOT_INTERVAL_MINUTES > 0:
+        from services.snapshot import start_snapshot_scheduler
+        start_snapshot_scheduler(app)
+    
     # Initialize database (comment out when run flask db upgrade)
     with app.app_context():
         # Create admin user if it doesn't exist
@@ -0,0 +1,350 @@
+"""Offline benchmark for the CafeF scraper.
+
+Record real CafeF responses once, then replay them from a local HTTP server
+and time ``process_stock_list`` without touching the network:
+
+    # Save search API responses and stock pages for a few symbols
+    python benchmarks/scrape_replay.py record VNM FPT HPG MWG
+
+    # Replay them through every mode and a few worker counts
+    python benchmarks/scrape_replay.py run --modes http,auto,selenium --workers 1,2,4
+
+    # Or just serve the fixtures, e.g. to poke at them with a browser
+    python benchmarks/scrape_replay.py serve --port 8765
+
+``record`` stores each stock page twice: the static HTML as served and the
+DOM Chrome renders once the price is filled in (with scripts stripped so
+replays don't try to reach the network). ``run --page rendered`` serves the
+latter, which is what a complete scrape looks like; the default ``static``
+makes 'auto' mode fall back to Selenium like it does against the live site.
+
+The benchmark writes StockStats for the fixture symbols through the normal
+code path, so point DATABASE_URL at a scratch database.
+"""
+import argparse
+import json
+import os
+import re
+import resource
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DEFAULT_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+BENCH_USER_EMAIL = 'scrape-benchmark@localhost'
+
+
+def _fixture_paths(fixtures):
+    return {
+        'manifest': os.path.join(fixtures, 'manifest.json'),
+        'search': os.path.join(fixtures, 'search'),
+        'static': os.path.join(fixtures, 'pages', 'static'),
+        'rendered': os.path.join(fixtures, 'pages', 'rendered'),
+    }
+
+
+def load_manifest(fixtures):
+    """Return ``{symbol: page path}`` for the recorded fixtures."""
+    with open(_fixture_paths(fixtures)['manifest'], encoding='utf-8') as f:
+        return json.load(f)
+
+
+def record(symbols, fixtures, rendered=True):
+    """Fetch search results and stock pages from live CafeF into ``fixtures``."""
+    from services.get_stock_data import scraper, price_rendered
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.common.exceptions import TimeoutException
+    from config import Config
+
+    paths = _fixture_paths(fixtures)
+    for key in ('search', 'static', 'rendered'):
+        os.makedirs(paths[key], exist_ok=True)
+    manifest = load_manifest(fixtures) if os.path.exists(paths['manifest']) else {}
+
+    for symbol in symbols:
+        response = scraper.http.get(
+            Config.CAFEF_SEARCH_URL, params={'keyword': symbol}, timeout=Config.SCRAPER_HTTP_TIMEOUT
+        )
+        response.raise_for_status()
+        with open(os.path.join(paths['search'], f'{symbol}.json'), 'w', encoding='utf-8') as f:
+            f.write(response.text)
+
+        stock_url = scraper.search_stock_url(symbol)
+        if not stock_url:
+            print(f"{symbol}: not found, only the search response was saved")
+            continue
+        manifest[symbol] = urlparse(stock_url).path
+
+        response = scraper.http.get(stock_url, timeout=Config.SCRAPER_HTTP_TIMEOUT)
+        response.raise_for_status()
+        with open(os.path.join(paths['static'], f'{symbol}.html'), 'w', encoding='utf-8') as f:
+            f.write(response.text)
+
+        if rendered:
+            with scraper.pool.driver() as driver:
+                driver.get(stock_url)
+                try:
+                    WebDriverWait(driver, Config.SCRAPER_ELEMENT_TIMEOUT).until(price_rendered)
+                except TimeoutException:
+                    print(f"{symbol}: price did not render, saving the page anyway")
+                page_source = driver.page_source
+            page_source = re.sub(r'<script\b.*?</script>', '', page_source, flags=re.S | re.I)
+            with open(os.path.join(paths['rendered'], f'{symbol}.html'), 'w', encoding='utf-8') as f:
+                f.write(page_source)
+        print(f"{symbol}: recorded {stock_url}")
+
+    with open(paths['manifest'], 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    scraper.pool.close()
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    """Serves ``/search?keyword=X`` and the recorded stock page paths."""
+
+    fixtures = DEFAULT_FIXTURES
+    page = 'static'
+    pages_by_path = {}
+
+    def do_GET(self):
+        paths = _fixture_paths(self.fixtures)
+        url = urlparse(self.path)
+        if url.path == '/search':
+            symbol = parse_qs(url.query).get('keyword', [''])[0]
+            self._send_file(os.path.join(paths['search'], f'{symbol}.json'), 'application/json')
+        elif url.path in self.pages_by_path:
+            symbol = self.pages_by_path[url.path]
+            self._send_file(os.path.join(paths[self.page], f'{symbol}.html'), 'text/html; charset=utf-8')
+        else:
+            self.send_error(404)
+
+    def _send_file(self, path, content_type):
+        if not os.path.exists(path):
+            self.send_error(404)
+            return
+        with open(path, 'rb') as f:
+            body = f.read()
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(fixtures, page='static', port=0):
+    """Serve ``fixtures`` on a background thread and return the server."""
+    handler = type('Handler', (ReplayHandler,), {
+        'fixtures': fixtures,
+        'page': page,
+        'pages_by_path': {path: symbol for symbol, path in load_manifest(fixtures).items()},
+    })
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    threading.Thread(target=server.serve_forever, name='replay-server', daemon=True).start()
+    return server
+
+
+class PeakRssSampler:
+    """Samples the RSS of this process and its children (the Chrome sessions).
+
+    Reads /proc, so it only works on Linux. Elsewhere it falls back to this
+    process's own lifetime peak from getrusage.
+    """
+
+    def __init__(self, interval=0.05):
+        self._interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        self.peak_kb = 0
+
+    def _tree_rss_kb(self):
+        parents = {}
+        rss = {}
+        for pid in os.listdir('/proc'):
+            if not pid.isdigit():
+                continue
+            try:
+                with open(f'/proc/{pid}/status') as f:
+                    fields = dict(line.split(':', 1) for line in f if ':' in line)
+            except OSError:
+                continue
+            parents.setdefault(int(fields['PPid']), []).append(int(pid))
+            rss[int(pid)] = int(fields.get('VmRSS', '0 kB').split()[0])
+        total, stack = 0, [os.getpid()]
+        while stack:
+            pid = stack.pop()
+            total += rss.get(pid, 0)
+            stack.extend(parents.get(pid, []))
+        return total
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak_kb = max(self.peak_kb, self._tree_rss_kb())
+            self._stop.wait(self._interval)
+
+    def __enter__(self):
+        if os.path.isdir('/proc'):
+            self._thread = threading.Thread(target=self._run, name='rss-sampler', daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        if self._thread:
+            self._stop.set()
+            self._thread.join()
+        else:
+            self.peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _prepare_database(symbols):
+    """Make sure the fixture symbols and the benchmark user exist."""
+    from extensions import db
+    from models import Stock, User
+
+    known = {symbol for (symbol,) in db.session.query(Stock.symbol).filter(Stock.symbol.in_(symbols)).all()}
+    for symbol in symbols:
+        if symbol not in known:
+            db.session.add(Stock(symbol=symbol, name=symbol))
+    user = User.query.filter_by(email=BENCH_USER_EMAIL).first()
+    if not user:
+        user = User(email=BENCH_USER_EMAIL, name='Scrape benchmark')
+        user.is_active = True
+        db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def run_case(symbols, user, mode, workers, warm_url_cache=False):
+    """Time one ``process_stock_list`` call and return a result row."""
+    from config import Config
+    from services.driver_pool import DriverPool
+    from services.get_stock_data import scraper, process_stock_list
+    from services.stock_urls import invalidate_stock_urls
+
+    Config.SCRAPER_MODE = mode
+    Config.SCRAPER_WORKERS = workers
+    # Start every case with cold browsers sized for this concurrency
+    scraper.pool.close()
+    scraper.pool = DriverPool(scraper.create_driver, size=workers, max_pages=Config.SCRAPER_MAX_PAGES_PER_DRIVER)
+    if not warm_url_cache:
+        invalidate_stock_urls(symbols)
+
+    outcomes = {}
+    with PeakRssSampler() as sampler:
+        started = time.perf_counter()
+        process_stock_list(symbols, user, on_result=lambda symbol, ok: outcomes.__setitem__(symbol, ok))
+        seconds = time.perf_counter() - started
+    scraper.pool.close()
+
+    ok = sum(1 for value in outcomes.values() if value)
+    return {
+        'mode': mode,
+        'workers': workers,
+        'symbols': len(symbols),
+        'ok': ok,
+        'failed': len(symbols) - ok,
+        'seconds': round(seconds, 3),
+        'symbols_per_sec': round(len(symbols) / seconds, 2) if seconds else None,
+        'peak_rss_mb': round(sampler.peak_kb / 1024, 1),
+    }
+
+
+def run(fixtures, modes, workers_list, page='static', repeat=1, warm_url_cache=False):
+    """Replay the fixtures through every mode and worker count."""
+    from config import Config
+    from services.get_stock_data import scraper
+    from services.scrape_engine import HostRateLimiter
+
+    symbols = sorted(load_manifest(fixtures))
+    if not symbols:
+        raise SystemExit(f"No recorded symbols in {fixtures}, run 'record' first")
+
+    server = start_server(fixtures, page=page)
+    base_url = f'http://127.0.0.1:{server.server_address[1]}'
+    Config.CAFEF_BASE_URL = base_url
+    Config.CAFEF_SEARCH_URL = f'{base_url}/search'
+    # The local server doesn't need protecting, measure the scraper itself
+    scraper.rate_limiter = HostRateLimiter(0)
+
+    from app import create_app
+    app = create_app(profile='cli')
+    results = []
+    try:
+        with app.app_context():
+            user = _prepare_database(symbols)
+            for mode in modes:
+                for workers in workers_list:
+                    for _ in range(repeat):
+                        result = run_case(symbols, user, mode, workers, warm_url_cache=warm_url_cache)
+                        result['page'] = page
+                        results.append(result)
+                        print(json.dumps(result))
+    finally:
+        server.shutdown()
+    return results
+
+
+def print_table(results):
+    columns = ('mode', 'page', 'workers', 'symbols', 'ok', 'failed', 'seconds', 'symbols_per_sec', 'peak_rss_mb')
+    widths = {column: max(len(column), *(len(str(row[column])) for row in results)) for column in columns}
+    print('  '.join(column.ljust(widths[column]) for column in columns))
+    for row in results:
+        print('  '.join(str(row[column]).ljust(widths[column]) for column in columns))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--fixtures', default=DEFAULT_FIXTURES, help='Fixture directory')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    record_parser = commands.add_parser('record', help='Record fixtures from live CafeF')
+    record_parser.add_argument('symbols', nargs='+')
+    record_parser.add_argument('--no-rendered', action='store_true', help='Skip the Chrome-rendered page')
+
+    serve_parser = commands.add_parser('serve', help='Serve recorded fixtures')
+    serve_parser.add_argument('--port', type=int, default=8765)
+    serve_parser.add_argument('--page', choices=('static', 'rendered'), default='static')
+
+    run_parser = commands.add_parser('run', help='Benchmark process_stock_list against the fixtures')
+    run_parser.add_argument('--modes', default='http,auto,selenium', help='Comma separated SCRAPER_MODE values')
+    run_parser.add_argument('--workers', default='1,2,4', help='Comma separated SCRAPER_WORKERS values')
+    run_parser.add_argument('--page', choices=('static', 'rendered'), default='static')
+    run_parser.add_argument('--repeat', type=int, default=1)
+    run_parser.add_argument('--warm-url-cache', action='store_true', help='Keep cached URLs between cases')
+    run_parser.add_argument('--json', help='Also write the results to this file')
+
+    args = parser.parse_args()
+    if args.command == 'record':
+        record([symbol.upper() for symbol in args.symbols], args.fixtures, rendered=not args.no_rendered)
+    elif args.command == 'serve':
+        server = start_server(args.fixtures, page=args.page, port=args.port)
+        print(f"Serving {args.fixtures} on http://127.0.0.1:{server.server_address[1]}")
+        print(f"CAFEF_BASE_URL=http://127.0.0.1:{server.server_address[1]}")
+        print(f"CAFEF_SEARCH_URL=http://127.0.0.1:{server.server_address[1]}/search")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.shutdown()
+    else:
+        results = run(
+            args.fixtures,
+            [mode.strip() for mode in args.modes.split(',') if mode.strip()],
+            [int(workers) for workers in args.workers.split(',') if workers.strip()],
+            page=args.page,
+            repeat=args.repeat,
+            warm_url_cache=args.warm_url_cache,
+        )
+        print()
+        print_table(results)
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -26,6 +26,15 @@ def load_google_credentials():
             'client_secret': os.getenv('GOOGLE_CLIENT_SECRET')
         }
 
+def parse_minutes_map(value):
+    """Parse 'UPCOM:60,HNX:30' into {'UPCOM': 60, 'HNX': 30}."""
+    result = {}
+    for item in (value or '').split(','):
+        if ':' in item:
+            key, minutes = item.split(':', 1)
+            result[key.strip()] = int(minutes)
+    return result
+
 class Config:
     # Flask configuration
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-key-please-change-in-production')
@@ -51,4 +60,55 @@ class Config:
     google_creds = load_google_credentials()
     GOOGLE_CLIENT_ID = google_creds['client_id']
     GOOGLE_CLIENT_SECRET = google_creds['client_secret']
-    GOOGLE_DISCOVERY_URL = "https://accounts.google.com/.well-known/openid-configuration" 
\ No newline at end of file
+    GOOGLE_DISCOVERY_URL = "https://accounts.google.com/.well-known/openid-configuration"
+
+    # Scraper configuration
+    CAFEF_BASE_URL = os.getenv('CAFEF_BASE_URL', 'https://cafef.vn').rstrip('/')  # Stock pages, point at a replay server to benchmark offline
+    CAFEF_SEARCH_URL = os.getenv('CAFEF_SEARCH_URL', 'https://search.cafef.vn/api/searching/v1/Companies/SearchByKeyWord')
+    SCRAPER_POOL_SIZE = int(os.getenv('SCRAPER_POOL_SIZE', '2'))  # Max concurrent Chrome sessions
+    SCRAPER_MAX_PAGES_PER_DRIVER = int(os.getenv('SCRAPER_MAX_PAGES_PER_DRIVER', '50'))  # Recycle a driver after N pages
+    SCRAPER_WORKERS = int(os.getenv('SCRAPER_WORKERS', '2'))  # Symbols scraped in parallel
+    SCRAPER_HOST_RATE_LIMIT = float(os.getenv('SCRAPER_HOST_RATE_LIMIT', '4'))  # Requests per second per host, 0 disables
+    SCRAPER_MODE = os.getenv('SCRAPER_MODE', 'auto')  # auto (HTTP, then Selenium), http or selenium
+    SCRAPER_HTTP_TIMEOUT = float(os.getenv('SCRAPER_HTTP_TIMEOUT', '10'))  # Seconds
+    SCRAPER_COALESCE_TIMEOUT = float(os.getenv('SCRAPER_COALESCE_TIMEOUT', '300'))  # Seconds to wait on another pull's scrape
+    SCRAPER_PAGE_LOAD_TIMEOUT = float(os.getenv('SCRAPER_PAGE_LOAD_TIMEOUT', '20'))  # Seconds for driver.get
+    SCRAPER_ELEMENT_TIMEOUT = float(os.getenv('SCRAPER_ELEMENT_TIMEOUT', '10'))  # Seconds to wait for the price to render
+    SCRAPER_BLOCKED_URLS = [url.strip() for url in os.getenv('SCRAPER_BLOCKED_URLS', '').split(',') if url.strip()]  # Extra blocked URL patterns
+    SCRAPER_DRIVER_RETRIES = int(os.getenv('SCRAPER_DRIVER_RETRIES', '2'))  # Extra attempts to start Chrome
+    SCRAPER_DRIVER_BACKOFF_SECONDS = float(os.getenv('SCRAPER_DRIVER_BACKOFF_SECONDS', '1'))  # Doubles after each attempt
+    SCRAPER_BREAKER_THRESHOLD = int(os.getenv('SCRAPER_BREAKER_THRESHOLD', '3'))  # Failed starts before pausing Chrome
+    SCRAPER_BREAKER_RESET_SECONDS = float(os.getenv('SCRAPER_BREAKER_RESET_SECONDS', '60'))  # Pause before trying Chrome again
+    STOCK_URL_CACHE_TTL_DAYS = int(os.getenv('STOCK_URL_CACHE_TTL_DAYS', '30'))  # Re-search resolved symbols after this
+    STOCK_URL_NEGATIVE_TTL_HOURS = int(os.getenv('STOCK_URL_NEGATIVE_TTL_HOURS', '24'))  # Re-search unknown symbols after this
+    JOB_WORKERS = int(os.getenv('JOB_WORKERS', '1'))  # Stats pulls run concurrently per process
+    JOB_HEARTBEAT_SECONDS = float(os.getenv('JOB_HEARTBEAT_SECONDS', '30'))  # How often a process marks its jobs alive
+    JOB_STALE_SECONDS = float(os.getenv('JOB_STALE_SECONDS', '180'))  # Unfinished jobs without a heartbeat this long are failed
+
+    # TradingView stock universe configuration
+    TRADINGVIEW_PAGE_SIZE = int(os.getenv('TRADINGVIEW_PAGE_SIZE', '500'))  # Scanner rows per request
+    TRADINGVIEW_WORKERS = int(os.getenv('TRADINGVIEW_WORKERS', '3'))  # Scanner pages fetched in parallel
+    TRADINGVIEW_MAX_ROWS = int(os.getenv('TRADINGVIEW_MAX_ROWS', '10000'))  # Safety cap on the universe size
+    TRADINGVIEW_TIMEOUT = float(os.getenv('TRADINGVIEW_TIMEOUT', '30'))  # Seconds per scanner request
+    MARKET_CAP_CHANGE_RATIO = float(os.getenv('MARKET_CAP_CHANGE_RATIO', '0.05'))  # Relative move before Stock.market_cap is rewritten and logged
+    STOCK_CHANGES_RETENTION_DAYS = int(os.getenv('STOCK_CHANGES_RETENTION_DAYS', '90'))  # Older change log entries are pruned, 0 keeps all
+
+    # Stats freshness configuration
+    STATS_TTL_MINUTES = int(os.getenv('STATS_TTL_MINUTES', '15'))  # Max stats age during trading hours
+    STATS_TTL_EXCHANGE_MINUTES = parse_minutes_map(os.getenv('STATS_TTL_EXCHANGE_MINUTES', ''))  # Per-exchange overrides, e.g. UPCOM:60
+    MARKET_UTC_OFFSET_HOURS = int(os.getenv('MARKET_UTC_OFFSET_HOURS', '7'))
+    MARKET_OPEN = os.getenv('MARKET_OPEN', '09:00')
+    MARKET_CLOSE = os.getenv('MARKET_CLOSE', '15:00')
+
+    # Market-wide stats snapshot configuration
+    STATS_SNAPSHOT_INTERVAL_MINUTES = int(os.getenv('STATS_SNAPSHOT_INTERVAL_MINUTES', '0'))  # 0 disables the in-process scheduler
+    SNAPSHOT_CHUNK_SIZE = int(os.getenv('SNAPSHOT_CHUNK_SIZE', '200'))  # Rows per upsert statement
+    STATS_HISTORY_RAW_DAYS = int(os.getenv('STATS_HISTORY_RAW_DAYS', '30'))  # Older history keeps one row per symbol and day, 0 keeps all
+
+    # Stock picker autocomplete
+    AUTOCOMPLETE_TTL_SECONDS = int(os.getenv('AUTOCOMPLETE_TTL_SECONDS', '300'))  # Rebuild the in-memory index after this
+
+    # Server-Sent Events configuration
+    SSE_HEARTBEAT_SECONDS = int(os.getenv('SSE_HEARTBEAT_SECONDS', '15'))  # Keep-alive comment interval
+    SSE_STREAM_MAX_SECONDS = int(os.getenv('SSE_STREAM_MAX_SECONDS', '300'))  # Clients reconnect after this 
+    SSE_MAX_STREAMS = int(os.getenv('SSE_MAX_STREAMS', '4'))  # Open streams per process, each holds a worker thread
@@ -2,6 +2,7 @@ from flask import jsonify, request
 from models import Payment, db
 from datetime import datetime, timezone
 from flask_restx import Resource, fields
+from utils.pagination import cursor_paginate, TOTAL_MODES
 
 def init_payment_routes(app, token_required, payments_ns):
     # Define models for Swagger documentation
@@ -19,6 +20,16 @@ def init_payment_routes(app, token_required, payments_ns):
         'updated_at': fields.DateTime(readonly=True, description='Last update date')
     })
 
+    paginated_payment_model = payments_ns.model('PaginatedPayment', {
+        'items': fields.List(fields.Nested(payment_model), description='List of payments'),
+        'total': fields.Integer(description='Total number of payments'),
+        'pages': fields.Integer(description='Total number of pages'),
+        'current_page': fields.Integer(description='Current page number'),
+        'has_next': fields.Boolean(description='Whether there is a next page'),
+        'has_prev': fields.Boolean(description='Whether there is a previous page'),
+        'next_cursor': fields.String(description='after= token for the next page (cursor mode only)')
+    })
+
     payment_create_model = payments_ns.model('PaymentCreate', {
         'amount': fields.Float(required=True, description='Payment amount'),
         'currency': fields.String(description='Currency code (defaults to USD)'),
@@ -43,13 +54,16 @@ def init_payment_routes(app, token_required, payments_ns):
         @payments_ns.param('payment_method', 'Filter by payment method', type=str)
         @payments_ns.param('start_date', 'Filter by start date (YYYY-MM-DD)', type=str)
         @payments_ns.param('end_date', 'Filter by end date (YYYY-MM-DD)', type=str)
-        @payments_ns.marshal_list_with(payment_model)
+        @payments_ns.param('after', 'Cursor mode: next_cursor of the previous page, empty for the first page', type=str)
+        @payments_ns.param('total', 'Cursor mode: approx or exact to include a total', type=str, enum=list(TOTAL_MODES))
+        @payments_ns.marshal_with(paginated_payment_model)
         @token_required
         def get(self, current_user):
             """List all payments for the current user with pagination and filters"""
             try:
                 page = request.args.get('page', 1, type=int)
                 per_page = request.args.get('per_page', 10, type=int)
+                after = request.args.get('after')
                 status = request.args.get('status')
                 payment_method = request.args.get('payment_method')
                 start_date = request.args.get('start_date')
@@ -68,8 +82,11 @@ def init_payment_routes(app, token_required, payments_ns):
                 if end_date:
                     query = query.filter(Payment.created_at <= datetime.strptime(end_date, '%Y-%m-%d'))
                 
-                # Order by creation date (newest first)
-                query = query.order_by(Payment.created_at.desc())
+                # Order by creation date (newest first), id breaks ties
+                order_by = [Payment.created_at.desc(), Payment.id.desc()]
+                if after is not None:
+                    return cursor_paginate(query, order_by, after, per_page, request.args.get('total'))
+                query = query.order_by(*order_by)
                 
                 # Paginate
                 pagination = query.paginate(page=page, per_page=per_page, error_out=False)
@@ -82,6 +99,8 @@ def init_payment_routes(app, token_required, payments_ns):
                     'has_next': pagination.has_next,
                     'has_prev': pagination.has_prev
                 }
+            except ValueError as e:
+                payments_ns.abort(400, message=str(e))
             except Exception as e:
                 payments_ns.abort(500, message=str(e))
 
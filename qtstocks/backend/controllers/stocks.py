@@ -1,30 +1,19 @@
-from flask import jsonify, request, current_app, send_file
-from models import Stock, StockStats, db, User, StockExchanges
-from datetime import datetime, timezone
+from flask import jsonify, request, current_app, send_file, Response
+from models import Stock, StockStats, db, User, StockExchanges, ScrapeJob, user_stock_stats
+from datetime import datetime, timezone, timedelta
 from functools import wraps
 from flask_restx import Resource, fields
-import pandas as pd
-import plotly
-import plotly.express as px
-import json
-import threading
 import queue
 import io
-from plotly.subplots import make_subplots
-import plotly.graph_objects as go
-import matplotlib
-matplotlib.use('Agg')  # Use non-interactive backend
-import matplotlib.pyplot as plt
-import matplotlib.patheffects as path_effects
-import numpy as np
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image, PageBreak, Frame, PageTemplate
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_CENTER
-from services.get_stock_data import process_stock_list
+import time
 from services.get_stock_lists import pull_stock_list
+from services.jobs import submit_stats_job, expire_stale_jobs
+from services.events import broker
+from services.stats_history import query_history, INTERVALS
+from services.stock_changes import changes_since
+from services.stock_search import search_stocks
+from services.autocomplete import suggestions
+from utils.pagination import cursor_paginate, TOTAL_MODES
 
 def init_stock_routes(app, token_required, stocks_ns):
     # Define models for Swagger documentation
@@ -33,6 +22,7 @@ def init_stock_routes(app, token_required, stocks_ns):
         'name': fields.String(required=True, description='Stock name'),
         'icon': fields.String(description='Stock icon URL'),
         'exchange': fields.String(description='Stock exchange'),
+        'sector': fields.String(description='Stock sector'),
         'last_updated': fields.DateTime(readonly=True, description='Last update timestamp')
     })
 
@@ -42,7 +32,8 @@ def init_stock_routes(app, token_required, stocks_ns):
         'pages': fields.Integer(description='Total number of pages'),
         'current_page': fields.Integer(description='Current page number'),
         'has_next': fields.Boolean(description='Whether there is a next page'),
-        'has_prev': fields.Boolean(description='Whether there is a previous page')
+        'has_prev': fields.Boolean(description='Whether there is a previous page'),
+        'next_cursor': fields.String(description='after= token for the next page (cursor mode only)')
     })
 
     stock_stats_model = stocks_ns.model('StockStats', {
@@ -51,6 +42,9 @@ def init_stock_routes(app, token_required, stocks_ns):
         'icon': fields.String(description='Stock icon URL'),
         'exchange': fields.String(description='Stock exchange'),
         'price': fields.Float(description='Current price'),
+        'quote_price': fields.Float(description='TradingView price from the last stock list pull'),
+        'volume': fields.Float(description='Latest session volume'),
+        'quoted_at': fields.String(description='When quote_price and volume were pulled'),
         'market_cap': fields.Float(description='Market capitalization'),
         'eps': fields.Float(description='Earnings per share'),
         'pe': fields.Float(description='Price-to-earnings ratio'),
@@ -58,6 +52,14 @@ def init_stock_routes(app, token_required, stocks_ns):
         'last_updated': fields.String(description='Last update timestamp')
     })
 
+    stock_suggestion_model = stocks_ns.model('StockSuggestion', {
+        'symbol': fields.String(description='Stock symbol'),
+        'name': fields.String(description='Stock name'),
+        'exchange': fields.String(description='Stock exchange'),
+        'icon': fields.String(description='Stock icon URL'),
+        'market_cap': fields.Float(description='Market capitalization')
+    })
+
     stock_exchange_model = stocks_ns.model('StockExchange', {
         'exchange': fields.String(required=True, description='Stock exchange name')
     })
@@ -67,6 +69,50 @@ def init_stock_routes(app, token_required, stocks_ns):
         'loadLatestData': fields.Boolean(required=True, description='Whether to load latest data')
     })
 
+    scrape_job_model = stocks_ns.model('ScrapeJob', {
+        'id': fields.String(readonly=True, description='Job identifier'),
+        'status': fields.String(description='queued, running, completed or failed'),
+        'symbols': fields.List(fields.String, description='Requested stock symbols'),
+        'total': fields.Integer(description='Number of symbols to process'),
+        'done': fields.Integer(description='Symbols updated successfully'),
+        'failed': fields.Integer(description='Symbols that could not be updated'),
+        'eta_seconds': fields.Float(description='Estimated seconds until the job finishes'),
+        'error': fields.String(description='Error message if the job failed'),
+        'created_at': fields.DateTime(description='Submission timestamp'),
+        'started_at': fields.DateTime(description='Start timestamp'),
+        'finished_at': fields.DateTime(description='Completion timestamp')
+    })
+
+    history_point_model = stocks_ns.model('StockStatsHistoryPoint', {
+        'time': fields.DateTime(description='Snapshot time, or bucket start for rollups'),
+        'price': fields.Float(description='Stock price'),
+        'market_cap': fields.Float(description='Market capitalization'),
+        'eps': fields.Float(description='Earnings per share'),
+        'pe': fields.Float(description='Price to earnings ratio'),
+        'pb': fields.Float(description='Price to book ratio'),
+        'price_open': fields.Float(description='First price in the bucket (rollups only)'),
+        'price_high': fields.Float(description='Highest price in the bucket (rollups only)'),
+        'price_low': fields.Float(description='Lowest price in the bucket (rollups only)'),
+        'samples': fields.Integer(description='Snapshots in the bucket (rollups only)')
+    })
+
+    stock_history_model = stocks_ns.model('StockStatsHistory', {
+        'symbol': fields.String(description='Stock symbol'),
+        'interval': fields.String(description='raw, day or week'),
+        'start': fields.DateTime(description='Range start (inclusive)'),
+        'end': fields.DateTime(description='Range end (exclusive)'),
+        'points': fields.List(fields.Nested(history_point_model))
+    })
+
+    stock_change_model = stocks_ns.model('StockChange', {
+        'id': fields.Integer(description='Change id, pass the last one seen as since'),
+        'symbol': fields.String(description='Stock symbol'),
+        'change_type': fields.String(description='listed, delisted, exchange_moved, market_cap_changed or updated'),
+        'old_value': fields.Raw(description='Previous value, if any'),
+        'new_value': fields.Raw(description='New value, if any'),
+        'created_at': fields.DateTime(description='When the refresh recorded the change')
+    })
+
     remove_stats_request_model = stocks_ns.model('RemoveStatsRequest', {
         'symbols': fields.List(fields.String, required=True, description='List of stock symbols to remove')
     })
@@ -78,6 +124,8 @@ def init_stock_routes(app, token_required, stocks_ns):
         @stocks_ns.param('per_page', 'Items per page', type=int, default=10)
         @stocks_ns.param('search', 'Search by symbol or name (partial match, UTF-8 supported)', type=str)
         @stocks_ns.param('exchanges', 'Filter by exchanges (comma-separated list)', type=str)
+        @stocks_ns.param('after', 'Cursor mode: next_cursor of the previous page, empty for the first page', type=str)
+        @stocks_ns.param('total', 'Cursor mode: approx or exact to include a total', type=str, enum=list(TOTAL_MODES))
         @stocks_ns.marshal_with(paginated_stock_model)
         @token_required
         def get(self, current_user):
@@ -87,32 +135,36 @@ def init_stock_routes(app, token_required, stocks_ns):
                 per_page = request.args.get('per_page', 10, type=int)
                 search = request.args.get('search', '').strip()
                 exchanges = [ex.strip() for ex in request.args.get('exchanges', '').split(',') if ex.strip()]
+                after = request.args.get('after')
                 
-                # Build query
-                query = Stock.query
+                # Build query, delisted stocks can't be pulled any more
+                query = Stock.query.filter(Stock.delisted_at.is_(None))
                 
-                # Apply search filter if provided
+                # Apply search filter if provided, ranked by how well stocks match
+                search_order = []
                 if search:
-                    search_term = f"%{search}%"
-                    # Use unaccent for better UTF-8 support
-                    query = query.filter(
-                        db.or_(
-                            Stock.symbol.ilike(search_term),
-                            db.func.unaccent(Stock.name).ilike(db.func.unaccent(search_term))
-                        )
-                    )
+                    query, search_order = search_stocks(query, search)
                 
                 # Apply exchanges filter if provided
                 if exchanges:
                     query = query.filter(Stock.exchange.in_(exchanges))
                     
-                # Filter out stocks that are already in user's stock_stats
-                user_stock_symbols = [stat.symbol for stat in current_user.stock_stats]
-                query = query.filter(~Stock.symbol.in_(user_stock_symbols))
+                # Filter out stocks that are already in user's stock_stats, as a
+                # NOT EXISTS anti-join probing the (user_id, stock_symbol) primary key
+                tracked = db.session.query(user_stock_stats.c.stock_symbol).filter(
+                    user_stock_stats.c.user_id == current_user.id,
+                    user_stock_stats.c.stock_symbol == Stock.symbol
+                )
+                query = query.filter(~tracked.exists())
                 
                 # Query with pagination
-                # Sort by market_cap in descending order, handling NULL values last
-                query = query.order_by(db.desc(db.func.coalesce(Stock.market_cap, 0)))
+                # Sort by market_cap in descending order, handling NULL values last.
+                # Matches ix_stock_listed_market_cap; symbol keeps pages stable on ties
+                order_by = [*search_order, db.desc(db.func.coalesce(Stock.market_cap, 0)), Stock.symbol]
+                if after is not None:
+                    return cursor_paginate(query, order_by, after, per_page, request.args.get('total'))
+                
+                query = query.order_by(*order_by)
                 pagination = query.paginate(
                     page=page,
                     per_page=per_page,
@@ -127,6 +179,8 @@ def init_stock_routes(app, token_required, stocks_ns):
                     'has_next': pagination.has_next,
                     'has_prev': pagination.has_prev
                 }
+            except ValueError as e:
+                stocks_ns.abort(400, message=str(e))
             except Exception as e:
                 stocks_ns.abort(500, message=str(e))
 
@@ -141,6 +195,32 @@ def init_stock_routes(app, token_required, stocks_ns):
                 stocks_ns.abort(500, message)
             return {'message': message}
             
+    @stocks_ns.route('/suggest')
+    class StockSuggest(Resource):
+        @stocks_ns.doc('suggest_stocks', security='Bearer')
+        @stocks_ns.param('q', 'Symbol or name prefix, accents optional', type=str)
+        @stocks_ns.param('limit', 'Maximum number of suggestions (max 50)', type=int, default=10)
+        @stocks_ns.marshal_list_with(stock_suggestion_model)
+        @token_required
+        def get(self, current_user):
+            """Suggest stocks for a search box from the in-memory index"""
+            query = request.args.get('q', '').strip()
+            limit = max(1, min(request.args.get('limit', 10, type=int), 50))
+            return suggestions.suggest(query, limit)
+
+    @stocks_ns.route('/changes')
+    class StockChangeList(Resource):
+        @stocks_ns.doc('list_stock_changes', security='Bearer')
+        @stocks_ns.param('since', 'Only return changes with a larger id', type=int, default=0)
+        @stocks_ns.param('limit', 'Maximum number of changes (max 1000)', type=int, default=500)
+        @stocks_ns.marshal_list_with(stock_change_model)
+        @token_required
+        def get(self, current_user):
+            """List stock universe changes recorded by list refreshes"""
+            since = request.args.get('since', 0, type=int)
+            limit = max(1, min(request.args.get('limit', 500, type=int), 1000))
+            return changes_since(since, limit)
+
     @stocks_ns.route('/<string:symbol>')
     @stocks_ns.param('symbol', 'The stock symbol')
     class StockResource(Resource):
@@ -151,35 +231,60 @@ def init_stock_routes(app, token_required, stocks_ns):
             """Get a stock by symbol"""
             return Stock.query.get_or_404(symbol)
 
+    @stocks_ns.route('/<string:symbol>/history')
+    @stocks_ns.param('symbol', 'The stock symbol')
+    class StockHistoryResource(Resource):
+        @stocks_ns.doc('get_stock_history', security='Bearer')
+        @stocks_ns.param('start', 'Range start, ISO date or datetime (default: 30 days before end)', type=str)
+        @stocks_ns.param('end', 'Range end, ISO date or datetime (default: now)', type=str)
+        @stocks_ns.param('interval', 'raw, day or week', type=str, default='raw')
+        @stocks_ns.marshal_with(stock_history_model)
+        @token_required
+        def get(self, current_user, symbol):
+            """Get recorded stats for a stock over a time range"""
+            interval = request.args.get('interval', 'raw')
+            if interval not in INTERVALS:
+                stocks_ns.abort(400, f"interval must be one of: {', '.join(INTERVALS)}")
+            try:
+                end = datetime.fromisoformat(request.args['end']) if request.args.get('end') else datetime.utcnow()
+                start = datetime.fromisoformat(request.args['start']) if request.args.get('start') else end - timedelta(days=30)
+            except ValueError:
+                stocks_ns.abort(400, "start and end must be ISO dates")
+            return {
+                'symbol': symbol,
+                'interval': interval,
+                'start': start,
+                'end': end,
+                'points': query_history(symbol, start, end, interval)
+            }
+
     @stocks_ns.route('/stats')
     @stocks_ns.param('symbol', 'The stock symbol')
     class StockStatsResource(Resource):
         @stocks_ns.doc('get_stock_stats', security='Bearer')
-        @stocks_ns.marshal_list_with(stock_stats_model)
+        @stocks_ns.response(200, 'Success', [stock_stats_model])
         @token_required
         def get(self, current_user):
             """Get stats for all stocks in user's portfolio"""
             try:
-                # Query stocks that have stats
-                user_stock_symbols = [stock.symbol for stock in current_user.stock_stats]
-                stocks_with_stats = db.session.query(Stock)\
-                    .join(StockStats, Stock.symbol == StockStats.symbol)\
-                    .filter(Stock.symbol.in_(user_stock_symbols))\
-                    .all()
-                return [
-                    {
-                        'symbol': stock.symbol,
-                        'name': stock.name,
-                        'icon': stock.icon,
-                        'exchange': stock.exchange,
-                        'last_updated': stock.stats.last_updated.strftime('%Y-%m-%d %H:%M:%S'),
-                        'price': stock.stats.price,
-                        'market_cap': stock.stats.market_cap,
-                        'eps': stock.stats.eps,
-                        'pe': stock.stats.pe,
-                        'pb': stock.stats.pb
-                    } for stock in stocks_with_stats
+                # One join from the user's tracked symbols, selecting plain columns
+                # so no ORM objects or lazy stock.stats loads are involved
+                columns = [
+                    Stock.symbol, Stock.name, Stock.icon, Stock.exchange,
+                    db.func.to_char(StockStats.last_updated, 'YYYY-MM-DD HH24:MI:SS').label('last_updated'),
+                    StockStats.price, StockStats.quote_price, StockStats.volume,
+                    db.func.to_char(StockStats.quoted_at, 'YYYY-MM-DD HH24:MI:SS').label('quoted_at'),
+                    StockStats.market_cap, StockStats.eps, StockStats.pe, StockStats.pb
                 ]
+                rows = db.session.query(*columns)\
+                    .select_from(user_stock_stats)\
+                    .join(StockStats, StockStats.symbol == user_stock_stats.c.stock_symbol)\
+                    .join(Stock, Stock.symbol == StockStats.symbol)\
+                    .filter(user_stock_stats.c.user_id == current_user.id)\
+                    .order_by(Stock.symbol)\
+                    .all()
+                keys = [column.key for column in columns]
+                return jsonify([dict(zip(keys, row)) for row in rows])
             except Exception as e:
                 stocks_ns.abort(500, message=str(e))
     
@@ -190,36 +295,87 @@ def init_stock_routes(app, token_required, stocks_ns):
         @stocks_ns.expect(pull_stats_request_model)
         @token_required
         def post(self, current_user):
-            """Pull stock statistics for selected stocks"""
-            try:
-                data = request.get_json()
-                requested_symbols = data.get('selectedStocks', [])
-                load_latest_data = data.get('loadLatestData', False)
+            """Queue a pull of stock statistics for selected stocks"""
+            data = request.get_json()
+            requested_symbols = data.get('selectedStocks', [])
+            load_latest_data = data.get('loadLatestData', False)
 
-                if not requested_symbols:
-                    stocks_ns.abort(400, "No stocks selected")
-                    
-                if load_latest_data:
-                    process_stock_list(requested_symbols, current_user)
-                else:
-                    available_symbols = db.session.query(StockStats.symbol).all();
-                    available_symbols = [stock_stat.symbol for stock_stat in available_symbols]
-                    reusable_symbols = [symbol for symbol in requested_symbols if symbol in available_symbols]
-                    request_new_symbols = [symbol for symbol in requested_symbols if symbol not in reusable_symbols]
-                    
-                    # Add any existing symbols to user's stock_stats if not already present
-                    for symbol in reusable_symbols:
-                        # Get the existing stats
-                        stats = StockStats.query.filter_by(symbol=symbol).first()
-                        if stats and stats not in current_user.stock_stats:
-                            current_user.stock_stats.append(stats)
-                            
-                    db.session.commit()
-                    process_stock_list(request_new_symbols, current_user)
-                return {'message': 'Stock statistics updated successfully'}
+            if not requested_symbols:
+                stocks_ns.abort(400, "No stocks selected")
+
+            try:
+                job = submit_stats_job(current_user, requested_symbols, load_latest_data)
+                return {'message': 'Stock statistics pull queued', 'job_id': job.id}, 202
             except Exception as e:
                 db.session.rollback()
-                stocks_ns.abort(500, f"Error updating stock statistics: {str(e)}")
+                stocks_ns.abort(500, f"Error queueing stock statistics pull: {str(e)}")
+
+    @stocks_ns.route('/jobs')
+    class StockJobList(Resource):
+        @stocks_ns.doc('list_stock_jobs', security='Bearer')
+        @stocks_ns.marshal_list_with(scrape_job_model)
+        @token_required
+        def get(self, current_user):
+            """List the user's most recent stock statistics pulls"""
+            expire_stale_jobs(current_user.id)
+            return ScrapeJob.query.filter_by(user_id=current_user.id)\
+                .order_by(ScrapeJob.created_at.desc())\
+                .limit(20)\
+                .all()
+
+    @stocks_ns.route('/jobs/<string:job_id>')
+    @stocks_ns.param('job_id', 'The job identifier')
+    class StockJobResource(Resource):
+        @stocks_ns.doc('get_stock_job', security='Bearer')
+        @stocks_ns.marshal_with(scrape_job_model)
+        @token_required
+        def get(self, current_user, job_id):
+            """Get status and progress of a stock statistics pull"""
+            job = db.session.get(ScrapeJob, job_id)
+            if not job or (job.user_id != current_user.id and not current_user.is_admin):
+                stocks_ns.abort(404, "Job not found")
+            expire_stale_jobs(job.user_id)
+            return job
+
+    @stocks_ns.route('/events')
+    class StockEvents(Resource):
+        @stocks_ns.doc('stock_events', security='Bearer')
+        @token_required
+        def get(self, current_user):
+            """Stream stats updates and pull job progress as Server-Sent Events"""
+            # Auth is the usual Bearer header, which EventSource can't send; the frontend reads this with fetch
+            user_id = current_user.id
+            subscription = broker.subscribe(user_id)
+            if subscription is None:
+                # Every stream pins a worker thread; past the cap clients re-read the job and retry
+                return Response(
+                    'Too many open event streams, retry later', status=503,
+                    mimetype='text/plain', headers={'Retry-After': '30'}
+                )
+            heartbeat = current_app.config['SSE_HEARTBEAT_SECONDS']
+            max_duration = current_app.config['SSE_STREAM_MAX_SECONDS']
+
+            def stream():
+                deadline = time.monotonic() + max_duration
+                try:
+                    # Ask clients to reconnect quickly when the stream is recycled
+                    yield "retry: 2000\n\n"
+                    while time.monotonic() < deadline:
+                        try:
+                            yield subscription.get(timeout=heartbeat)
+                        except queue.Empty:
+                            yield ": keepalive\n\n"
+                finally:
+                    broker.unsubscribe(subscription)
+
+            # The stream only reads its queue, so give the session token_required
+            # used back to the pool instead of leaving it idle in a transaction
+            db.session.remove()
+            return Response(
+                stream(),
+                mimetype='text/event-stream',
+                headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+            )
 
     @stocks_ns.route('/export')
     class StockExport(Resource):
@@ -227,6 +383,7 @@ def init_stock_routes(app, token_required, stocks_ns):
         @token_required
         def get(self, current_user):
             """Export stock data to CSV"""
+            import pandas as pd
             try:
                 stocks = Stock.query.all()
                 data = []
@@ -264,6 +421,19 @@ def init_stock_routes(app, token_required, stocks_ns):
         @token_required
         def get(self, current_user):
             """Export stock data to PDF with charts"""
+            # The reporting stack is only loaded when a report is requested
+            import matplotlib
+            matplotlib.use('Agg')  # Use non-interactive backend
+            import matplotlib.pyplot as plt
+            import matplotlib.patheffects as path_effects
+            import numpy as np
+            from reportlab.lib import colors
+            from reportlab.lib.pagesizes import letter
+            from reportlab.lib.units import inch
+            from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image, PageBreak, Frame, PageTemplate
+            from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+            from reportlab.lib.enums import TA_CENTER
+
             # Get symbols from query parameter
             symbols_param = request.args.get('symbols', '')
             if not symbols_param:
@@ -2,6 +2,7 @@ from flask import jsonify, request
 from models import Subscription, Payment, db
 from datetime import datetime, timezone, timedelta
 from flask_restx import Resource, fields
+from utils.pagination import cursor_paginate, TOTAL_MODES
 
 def init_subscription_routes(app, token_required, subscriptions_ns):
     # Define models for Swagger documentation
@@ -19,6 +20,16 @@ def init_subscription_routes(app, token_required, subscriptions_ns):
         'updated_at': fields.DateTime(readonly=True, description='Last update date')
     })
 
+    paginated_subscription_model = subscriptions_ns.model('PaginatedSubscription', {
+        'items': fields.List(fields.Nested(subscription_model), description='List of subscriptions'),
+        'total': fields.Integer(description='Total number of subscriptions'),
+        'pages': fields.Integer(description='Total number of pages'),
+        'current_page': fields.Integer(description='Current page number'),
+        'has_next': fields.Boolean(description='Whether there is a next page'),
+        'has_prev': fields.Boolean(description='Whether there is a previous page'),
+        'next_cursor': fields.String(description='after= token for the next page (cursor mode only)')
+    })
+
     subscription_create_model = subscriptions_ns.model('SubscriptionCreate', {
         'plan_type': fields.String(required=True, description='Subscription plan type'),
         'payment_id': fields.Integer(description='Associated payment ID'),
@@ -44,13 +55,16 @@ def init_subscription_routes(app, token_required, subscriptions_ns):
         @subscriptions_ns.param('status', 'Filter by subscription status', type=str)
         @subscriptions_ns.param('plan_type', 'Filter by plan type', type=str)
         @subscriptions_ns.param('active_only', 'Show only active subscriptions', type=bool)
-        @subscriptions_ns.marshal_list_with(subscription_model)
+        @subscriptions_ns.param('after', 'Cursor mode: next_cursor of the previous page, empty for the first page', type=str)
+        @subscriptions_ns.param('total', 'Cursor mode: approx or exact to include a total', type=str, enum=list(TOTAL_MODES))
+        @subscriptions_ns.marshal_with(paginated_subscription_model)
         @token_required
         def get(self, current_user):
             """List all subscriptions for the current user with pagination and filters"""
             try:
                 page = request.args.get('page', 1, type=int)
                 per_page = request.args.get('per_page', 10, type=int)
+                after = request.args.get('after')
                 status = request.args.get('status')
                 plan_type = request.args.get('plan_type')
                 active_only = request.args.get('active_only', type=bool)
@@ -71,8 +85,11 @@ def init_subscription_routes(app, token_required, subscriptions_ns):
                         (Subscription.end_date.is_(None) | (Subscription.end_date > now))
                     )
                 
-                # Order by creation date (newest first)
-                query = query.order_by(Subscription.created_at.desc())
+                # Order by creation date (newest first), id breaks ties
+                order_by = [Subscription.created_at.desc(), Subscription.id.desc()]
+                if after is not None:
+                    return cursor_paginate(query, order_by, after, per_page, request.args.get('total'))
+                query = query.order_by(*order_by)
                 
                 # Paginate
                 pagination = query.paginate(page=page, per_page=per_page, error_out=False)
@@ -85,6 +102,8 @@ def init_subscription_routes(app, token_required, subscriptions_ns):
                     'has_next': pagination.has_next,
                     'has_prev': pagination.has_prev
                 }
+            except ValueError as e:
+                subscriptions_ns.abort(400, message=str(e))
             except Exception as e:
                 subscriptions_ns.abort(500, message=str(e))
 
@@ -4,6 +4,7 @@ from extensions import ma
 from datetime import datetime, timezone
 from functools import wraps
 from flask_restx import Resource, fields
+from utils.pagination import cursor_paginate, TOTAL_MODES
 
 def admin_required(f):
     @wraps(f)
@@ -33,7 +34,8 @@ def init_user_routes(app, token_required, users_ns):
         'pages': fields.Integer(description='Total number of pages'),
         'current_page': fields.Integer(description='Current page number'),
         'has_next': fields.Boolean(description='Whether there is a next page'),
-        'has_prev': fields.Boolean(description='Whether there is a previous page')
+        'has_prev': fields.Boolean(description='Whether there is a previous page'),
+        'next_cursor': fields.String(description='after= token for the next page (cursor mode only)')
     })
 
     user_update_model = users_ns.model('UserUpdate', {
@@ -56,6 +58,13 @@ def init_user_routes(app, token_required, users_ns):
         help='Field to sort by (defaults to created_at)')
     user_list_parser.add_argument('sort_direction', type=str, location='args', 
         choices=['asc', 'desc'], help='Sort direction (asc or desc)')
+    user_list_parser.add_argument('after', type=str, location='args',
+        help='Cursor mode: next_cursor of the previous page, empty for the first page')
+    user_list_parser.add_argument('total', type=str, location='args', choices=list(TOTAL_MODES),
+        help='Cursor mode: approx or exact to include a total')
+
+    # Cursor mode needs sort keys that are never NULL
+    cursor_sort_fields = ['id', 'email', 'created_at']
 
     @users_ns.route('')
     class UserList(Resource):
@@ -77,6 +86,7 @@ def init_user_routes(app, token_required, users_ns):
             is_admin = args.get('is_admin')
             sort_by = args.get('sort_by', 'created_at')  # Default sort by created_at
             sort_direction = args.get('sort_direction', 'asc')  # Default ascending order
+            after = args.get('after')
             
             # Handle empty string for sort_by
             if sort_by == '':
@@ -110,11 +120,25 @@ def init_user_routes(app, token_required, users_ns):
             if is_admin is not None:
                 query = query.filter(User.is_admin == is_admin)
             
-            # Apply sorting
+            # Apply sorting, id breaks ties so pages don't overlap
             sort_column = getattr(User, sort_by)
+            id_column = User.id
             if sort_direction == 'desc':
                 sort_column = sort_column.desc()
-            query = query.order_by(sort_column)
+                id_column = id_column.desc()
+            order_by = [sort_column] if sort_by == 'id' else [sort_column, id_column]
+            
+            if after is not None:
+                if sort_by not in cursor_sort_fields:
+                    users_ns.abort(400, message=f"Cursor pagination can only sort by: {', '.join(cursor_sort_fields)}")
+                try:
+                    result = cursor_paginate(query, order_by, after, per_page or 10, args.get('total'))
+                except ValueError as e:
+                    users_ns.abort(400, message=str(e))
+                result['items'] = [user.to_dict() for user in result['items']]
+                return result
+            
+            query = query.order_by(*order_by)
             
             # Execute query with pagination
             pagination = query.paginate(page=page, per_page=per_page, error_out=False)
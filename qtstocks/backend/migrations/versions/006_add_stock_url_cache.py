@@ -0,0 +1,26 @@
+"""add stock url cache
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Symbol -> CafeF URL lookups, NULL url caches a failed search
+    op.create_table('stock_url_cache',
+        sa.Column('symbol', sa.String(10), primary_key=True),
+        sa.Column('url', sa.String(255), nullable=True),
+        sa.Column('resolved_at', sa.DateTime(), nullable=False)
+    )
+
+def downgrade():
+    op.drop_table('stock_url_cache')
@@ -0,0 +1,36 @@
+"""add scrape job
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table('scrape_job',
+        sa.Column('id', sa.String(36), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('user.id'), nullable=False),
+        sa.Column('status', sa.String(20), nullable=False, server_default='queued'),
+        sa.Column('symbols', sa.JSON(), nullable=False),
+        sa.Column('load_latest_data', sa.Boolean(), nullable=True),
+        sa.Column('total', sa.Integer(), nullable=True),
+        sa.Column('done', sa.Integer(), nullable=True),
+        sa.Column('failed', sa.Integer(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True)
+    )
+    op.create_index('ix_scrape_job_user_id_created_at', 'scrape_job', ['user_id', 'created_at'])
+
+def downgrade():
+    op.drop_index('ix_scrape_job_user_id_created_at', table_name='scrape_job')
+    op.drop_table('scrape_job')
@@ -0,0 +1,40 @@
+"""add stock stats history
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table('stock_stats_history',
+        sa.Column('symbol', sa.String(10), nullable=False),
+        sa.Column('captured_at', sa.DateTime(), nullable=False),
+        sa.Column('price', sa.Float(), nullable=True),
+        sa.Column('market_cap', sa.Float(), nullable=True),
+        sa.Column('eps', sa.Float(), nullable=True),
+        sa.Column('pe', sa.Float(), nullable=True),
+        sa.Column('pb', sa.Float(), nullable=True),
+        sa.PrimaryKeyConstraint('symbol', 'captured_at')
+    )
+    op.create_index('ix_stock_stats_history_captured_at', 'stock_stats_history', ['captured_at'], postgresql_using='brin')
+
+    # Seed the history with the values we already have
+    op.execute("""
+        INSERT INTO stock_stats_history (symbol, captured_at, price, market_cap, eps, pe, pb)
+        SELECT symbol, last_updated, price, market_cap, eps, pe, pb
+        FROM stock_stats
+        WHERE last_updated IS NOT NULL
+    """)
+
+def downgrade():
+    op.drop_index('ix_stock_stats_history_captured_at', table_name='stock_stats_history')
+    op.drop_table('stock_stats_history')
@@ -0,0 +1,23 @@
+"""add stock sector and stats volume
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('stock', sa.Column('sector', sa.String(100), nullable=True))
+    op.add_column('stock_stats', sa.Column('volume', sa.Float(), nullable=True))
+
+def downgrade():
+    op.drop_column('stock_stats', 'volume')
+    op.drop_column('stock', 'sector')
@@ -0,0 +1,34 @@
+"""add stock change log
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '010'
+down_revision = '009'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('stock', sa.Column('content_hash', sa.String(32), nullable=True))
+    op.add_column('stock', sa.Column('delisted_at', sa.DateTime(), nullable=True))
+    op.create_table('stock_change',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('symbol', sa.String(10), nullable=False),
+        sa.Column('change_type', sa.String(20), nullable=False),
+        sa.Column('old_value', sa.JSON(), nullable=True),
+        sa.Column('new_value', sa.JSON(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True)
+    )
+    op.create_index('ix_stock_change_symbol', 'stock_change', ['symbol'])
+
+def downgrade():
+    op.drop_index('ix_stock_change_symbol', table_name='stock_change')
+    op.drop_table('stock_change')
+    op.drop_column('stock', 'delisted_at')
+    op.drop_column('stock', 'content_hash')
@@ -0,0 +1,31 @@
+"""add stock listing index
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '011'
+down_revision = '010'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # Serves the stock browser's ORDER BY coalesce(market_cap, 0) DESC, symbol
+    # over listed stocks, so a page is read in index order and stops at LIMIT
+    op.create_index(
+        'ix_stock_listed_market_cap', 'stock',
+        [sa.text('coalesce(market_cap, 0) DESC'), 'symbol'],
+        postgresql_where=sa.text('delisted_at IS NULL')
+    )
+    # The NOT EXISTS probe uses the (user_id, stock_symbol) primary key of
+    # user_stock_stats; this one covers lookups by symbol, e.g. deleting stats
+    op.create_index('ix_user_stock_stats_stock_symbol', 'user_stock_stats', ['stock_symbol'])
+
+def downgrade():
+    op.drop_index('ix_user_stock_stats_stock_symbol', table_name='user_stock_stats')
+    op.drop_index('ix_stock_listed_market_cap', table_name='stock')
@@ -0,0 +1,33 @@
+"""add stock search indexes
+
+Revision ID: 012
+Revises: 011
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '012'
+down_revision = '011'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+    # unaccent() is only STABLE, so it can't be indexed; pinning the dictionary makes this IMMUTABLE
+    op.execute("""
+        CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+        AS $$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$
+    """)
+    # Expressions must match services.stock_search for the planner to use them
+    op.execute("CREATE INDEX ix_stock_symbol_trgm ON stock USING gin (lower(symbol) gin_trgm_ops)")
+    op.execute("CREATE INDEX ix_stock_name_trgm ON stock USING gin (lower(f_unaccent(name)) gin_trgm_ops)")
+
+def downgrade():
+    op.execute("DROP INDEX IF EXISTS ix_stock_name_trgm")
+    op.execute("DROP INDEX IF EXISTS ix_stock_symbol_trgm")
+    op.execute("DROP FUNCTION IF EXISTS f_unaccent(text)")
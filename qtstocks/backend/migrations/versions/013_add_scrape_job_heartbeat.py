@@ -0,0 +1,21 @@
+"""add scrape job heartbeat
+
+Revision ID: 013
+Revises: 012
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '013'
+down_revision = '012'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('scrape_job', sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+
+def downgrade():
+    op.drop_column('scrape_job', 'heartbeat_at')
@@ -0,0 +1,23 @@
+"""add stock stats quote columns
+
+Revision ID: 014
+Revises: 013
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '014'
+down_revision = '013'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column('stock_stats', sa.Column('quote_price', sa.Float(), nullable=True))
+    op.add_column('stock_stats', sa.Column('quoted_at', sa.DateTime(), nullable=True))
+
+def downgrade():
+    op.drop_column('stock_stats', 'quoted_at')
+    op.drop_column('stock_stats', 'quote_price')
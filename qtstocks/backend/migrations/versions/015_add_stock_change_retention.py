@@ -0,0 +1,23 @@
+"""add stock change retention index, rehash stocks without market cap
+
+Revision ID: 015
+Revises: 014
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '015'
+down_revision = '014'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_index('ix_stock_change_created_at', 'stock_change', ['created_at'], postgresql_using='brin')
+    # content_hash no longer covers market_cap; cleared hashes are backfilled by the next refresh without logging
+    op.execute("UPDATE stock SET content_hash = NULL")
+
+def downgrade():
+    op.drop_index('ix_stock_change_created_at', table_name='stock_change')
@@ -160,6 +160,9 @@ class Stock(db.Model):
     icon = db.Column(db.String(255), nullable=True)
     exchange = db.Column(db.String(50), nullable=True)
     market_cap = db.Column(db.Float, nullable=True)
+    sector = db.Column(db.String(100), nullable=True)
+    content_hash = db.Column(db.String(32), nullable=True)  # md5 of the TradingView columns, see services.stock_changes
+    delisted_at = db.Column(db.DateTime, nullable=True)  # Set when a full refresh no longer returns the symbol
     last_updated = db.Column(db.DateTime, default=datetime.utcnow)
     stats = db.relationship('StockStats', backref='stock', uselist=False)
 
@@ -170,6 +173,7 @@ class Stock(db.Model):
             'icon': self.icon,
             'exchange': self.exchange,
             'market_cap': self.market_cap,
+            'sector': self.sector,
             'last_updated': self.last_updated.strftime('%Y-%m-%d %H:%M:%S') if self.last_updated else None
         }
 
@@ -181,6 +185,7 @@ class Stock(db.Model):
             icon=data['icon'],
             exchange=data['exchange'],
             market_cap=data['market_cap'],
+            sector=data.get('sector'),
             last_updated=datetime.strptime(data['last_updated'], '%Y-%m-%d %H:%M:%S')
         )
 
@@ -192,12 +197,19 @@ class StockStats(db.Model):
     eps = db.Column(db.Float)
     pe = db.Column(db.Float)
     pb = db.Column(db.Float)
+    # TradingView quote from the last stock list pull, kept apart from the CafeF
+    # price above so it never sits next to P/E and EPS from another source and time
+    quote_price = db.Column(db.Float)
+    volume = db.Column(db.Float)  # Latest session volume from TradingView
+    quoted_at = db.Column(db.DateTime)
     last_updated = db.Column(db.DateTime, default=datetime.utcnow)
 
     def to_dict(self):
         return {
             'symbol': self.symbol,
             'price': self.price,
+            'quote_price': self.quote_price,
+            'volume': self.volume,
             'market_cap': self.market_cap,
             'eps': self.eps,
             'pe': self.pe,
@@ -217,6 +229,122 @@ class StockStats(db.Model):
             last_updated=datetime.strptime(data['last_updated'], '%Y-%m-%d %H:%M:%S')
         )
 
+class StockStatsHistory(db.Model):
+    """Copy of every StockStats write, for trends and charts.
+
+    Snapshots older than STATS_HISTORY_RAW_DAYS are compacted to the last
+    one per symbol and day, see services.stats_history.compact_history.
+    """
+    __tablename__ = 'stock_stats_history'
+    symbol = db.Column(db.String(10), primary_key=True)
+    captured_at = db.Column(db.DateTime, primary_key=True)
+    price = db.Column(db.Float)
+    market_cap = db.Column(db.Float)
+    eps = db.Column(db.Float)
+    pe = db.Column(db.Float)
+    pb = db.Column(db.Float)
+
+    # Per-symbol ranges use the primary key. Compaction scans all symbols by time,
+    # and rows arrive in time order, so a BRIN index covers that at a fraction of a btree's size
+    __table_args__ = (
+        db.Index('ix_stock_stats_history_captured_at', 'captured_at', postgresql_using='brin'),
+    )
+
+    def to_dict(self):
+        return {
+            'symbol': self.symbol,
+            'captured_at': self.captured_at.strftime('%Y-%m-%d %H:%M:%S'),
+            'price': self.price,
+            'market_cap': self.market_cap,
+            'eps': self.eps,
+            'pe': self.pe,
+            'pb': self.pb
+        }
+
+class StockUrlCache(db.Model):
+    """Resolved CafeF page URL per symbol. url is NULL when CafeF doesn't know the symbol."""
+    __tablename__ = 'stock_url_cache'
+    symbol = db.Column(db.String(10), primary_key=True)
+    url = db.Column(db.String(255), nullable=True)
+    resolved_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<StockUrlCache {self.symbol}>'
+
+class ScrapeJob(db.Model):
+    """Background stock stats pull and its progress"""
+    __tablename__ = 'scrape_job'
+
+    id = db.Column(db.String(36), primary_key=True)  # uuid4
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, completed, failed
+    symbols = db.Column(db.JSON, nullable=False)
+    load_latest_data = db.Column(db.Boolean, default=False)
+    total = db.Column(db.Integer, default=0)
+    done = db.Column(db.Integer, default=0)
+    failed = db.Column(db.Integer, default=0)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)  # Bumped while the process that owns the job is alive
+
+    @property
+    def eta_seconds(self):
+        """Remaining time extrapolated from the pace so far"""
+        processed = (self.done or 0) + (self.failed or 0)
+        if self.status != 'running' or not self.started_at or not processed:
+            return None
+        elapsed = (datetime.utcnow() - self.started_at).total_seconds()
+        return round(elapsed / processed * max(self.total - processed, 0), 1)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'symbols': self.symbols,
+            'total': self.total,
+            'done': self.done,
+            'failed': self.failed,
+            'eta_seconds': self.eta_seconds,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+    def __repr__(self):
+        return f'<ScrapeJob {self.id} {self.status}>'
+
+class StockChange(db.Model):
+    """Change log written by stock universe refreshes, read incrementally by id"""
+    __tablename__ = 'stock_change'
+
+    id = db.Column(db.Integer, primary_key=True)
+    symbol = db.Column(db.String(10), nullable=False, index=True)
+    change_type = db.Column(db.String(20), nullable=False)  # listed, delisted, exchange_moved, market_cap_changed, updated
+    old_value = db.Column(db.JSON)
+    new_value = db.Column(db.JSON)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # Retention pruning deletes by time and rows arrive in time order, so BRIN is enough
+    __table_args__ = (
+        db.Index('ix_stock_change_created_at', 'created_at', postgresql_using='brin'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'symbol': self.symbol,
+            'change_type': self.change_type,
+            'old_value': self.old_value,
+            'new_value': self.new_value,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+    def __repr__(self):
+        return f'<StockChange {self.id} {self.symbol} {self.change_type}>'
+
 class UserSettings(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
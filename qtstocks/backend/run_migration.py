@@ -1,7 +1,8 @@
 from app import create_app
 from extensions import db
 
-app = create_app()
+# Only db and migrate are needed to upgrade
+app = create_app(profile='cli')
 
 with app.app_context():
     from flask_migrate import upgrade
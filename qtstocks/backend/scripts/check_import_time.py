@@ -0,0 +1,78 @@
+"""Fail when importing the app gets slow or pulls in the heavy stacks again.
+
+    python scripts/check_import_time.py                 # checks `import app`
+    python scripts/check_import_time.py --budget 1.0 app controllers.stocks
+
+Each module is imported in a fresh interpreter with ``-X importtime``. The
+check fails if the cumulative import time exceeds the budget or if any of
+LAZY_MODULES got imported, since those must only load on first use.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Scraping and reporting stacks that must not load at import time
+LAZY_MODULES = (
+    'pandas', 'numpy', 'plotly', 'matplotlib', 'reportlab', 'selenium', 'bs4', 'lxml', 'odf',
+    'services.get_stock_data', 'services.snapshot',
+)
+
+
+def import_profile(module):
+    """Return ``[(cumulative_us, self_us, name), ...]`` for ``import module``."""
+    env = dict(os.environ)
+    # Config refuses to load without it; nothing connects during import
+    env.setdefault('DATABASE_URL', 'postgresql://localhost/import_check')
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"import {module} failed:\n{result.stderr}")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append((int(cumulative_us), int(self_us), name.rstrip()))
+    return rows
+
+
+def check(module, budget, top):
+    rows = import_profile(module)
+    total = next(cumulative for cumulative, _, name in reversed(rows) if name.strip() == module) / 1e6
+    loaded = {name.strip() for _, _, name in rows}
+    eager = [name for name in LAZY_MODULES if name in loaded]
+
+    print(f"import {module}: {total:.2f}s (budget {budget:.2f}s)")
+    for cumulative, self_us, name in sorted(rows, key=lambda row: row[1], reverse=True)[:top]:
+        print(f"  {self_us / 1e3:8.1f} ms self {cumulative / 1e3:8.1f} ms total  {name.strip()}")
+
+    ok = True
+    if total > budget:
+        print(f"FAIL: import {module} took {total:.2f}s, over the {budget:.2f}s budget")
+        ok = False
+    if eager:
+        print(f"FAIL: import {module} loaded {', '.join(eager)}, import them where they are used")
+        ok = False
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('modules', nargs='*', default=['app'])
+    parser.add_argument('--budget', type=float, default=float(os.getenv('IMPORT_TIME_BUDGET', '1.5')),
+                        help='Seconds allowed per module (default 1.5, or IMPORT_TIME_BUDGET)')
+    parser.add_argument('--top', type=int, default=10, help='Slowest modules to list')
+    args = parser.parse_args()
+
+    results = [check(module, args.budget, args.top) for module in args.modules]
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -11,7 +11,7 @@ fake = Faker()
 
 def generate_mock_users(num_users=100):
     """Generate mock users with various roles and statuses"""
-    app = create_app()
+    app = create_app(profile='cli')
     
     with app.app_context():
         # Get existing emails to avoid duplicates
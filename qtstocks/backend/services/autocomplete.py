@@ -0,0 +1,134 @@
+import heapq
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+from functools import lru_cache
+from flask import current_app
+from config import Config
+from extensions import db
+from models import Stock
+
+
+def fold(text):
+    """Lowercase and strip Vietnamese diacritics: 'Đường Sắt' -> 'duong sat'."""
+    text = (text or '').lower().replace('đ', 'd')
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ' '.join(''.join(c for c in decomposed if not unicodedata.combining(c)).split())
+
+
+def _prefix_range(keys, prefix):
+    """Indexes into sorted ``keys`` of the entries starting with ``prefix``."""
+    start = bisect_left(keys, (prefix,))
+    end = bisect_left(keys, (prefix + '￿',))
+    return range(start, end)
+
+
+class SuggestIndex:
+    """Immutable prefix index over the listed stocks.
+
+    Stocks are stored by descending market cap, so a stock's position is its
+    rank. Two sorted arrays hold ``(key, position)`` pairs: folded symbols,
+    and every word-boundary suffix of the folded name so "sua viet" finds
+    "Công ty Cổ phần Sữa Việt Nam".
+    """
+
+    def __init__(self, stocks):
+        self.stocks = sorted(stocks, key=lambda stock: (-(stock['market_cap'] or 0), stock['symbol']))
+        self.symbol_keys = sorted((fold(stock['symbol']), i) for i, stock in enumerate(self.stocks))
+        name_keys = []
+        for i, stock in enumerate(self.stocks):
+            words = fold(stock['name']).split(' ')
+            name_keys.extend((' '.join(words[j:]), i) for j in range(len(words)))
+        self.name_keys = sorted(name_keys)
+        # Short prefixes match hundreds of names; the index never changes, so cache answers
+        self._cached_suggest = lru_cache(maxsize=4096)(self._suggest)
+
+    def suggest(self, query, limit=10):
+        """Top ``limit`` stocks for ``query``.
+
+        Exact symbol matches come first, then symbol prefixes, then name
+        matches; ties go to the larger market cap.
+        """
+        prefix = fold(query)
+        if not prefix:
+            return []
+        return self._cached_suggest(prefix, limit)
+
+    def _suggest(self, prefix, limit):
+        ranked = {}
+        for k in _prefix_range(self.symbol_keys, prefix):
+            key, position = self.symbol_keys[k]
+            ranked[position] = (0 if key == prefix else 1, position)
+        for k in _prefix_range(self.name_keys, prefix):
+            position = self.name_keys[k][1]
+            ranked.setdefault(position, (2, position))
+        return [self.stocks[position] for _, position in heapq.nsmallest(limit, ranked.values())]
+
+
+class SuggestService:
+    """Process-local SuggestIndex, loaded from the database and swapped atomically.
+
+    The index is rebuilt in the background once it is older than
+    AUTOCOMPLETE_TTL_SECONDS, and right away when ``reload`` is called after
+    the stock universe changed, so queries never wait on the database
+    except for the very first one.
+    """
+
+    def __init__(self):
+        self._index = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._reloading = False
+        self._stale = False
+
+    def load(self):
+        """Build a fresh index from the database. Needs an app context."""
+        rows = db.session.query(
+            Stock.symbol, Stock.name, Stock.exchange, Stock.icon, Stock.market_cap
+        ).filter(Stock.delisted_at.is_(None)).all()
+        index = SuggestIndex([row._asdict() for row in rows])
+        with self._lock:
+            self._index = index
+            self._loaded_at = time.monotonic()
+        print(f"Autocomplete index loaded with {len(index.stocks)} stocks")
+        return index
+
+    def reload(self, app=None):
+        """Rebuild the index on a daemon thread, keeping the old one until it's ready."""
+        with self._lock:
+            if self._reloading:
+                # The running rebuild may have read the old universe, go again after it
+                self._stale = True
+                return
+            self._reloading = True
+        app = app or current_app._get_current_object()
+
+        def run():
+            with app.app_context():
+                try:
+                    while True:
+                        self.load()
+                        with self._lock:
+                            if not self._stale:
+                                break
+                            self._stale = False
+                except Exception as e:
+                    print(f"Error loading autocomplete index: {e}")
+                finally:
+                    with self._lock:
+                        self._reloading = False
+                    db.session.remove()
+
+        threading.Thread(target=run, name='autocomplete-reload', daemon=True).start()
+
+    def suggest(self, query, limit=10):
+        index = self._index
+        if index is None:
+            index = self.load()
+        elif time.monotonic() - self._loaded_at > Config.AUTOCOMPLETE_TTL_SECONDS:
+            self.reload()
+        return index.suggest(query, limit)
+
+
+suggestions = SuggestService()
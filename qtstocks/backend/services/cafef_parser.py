@@ -0,0 +1,83 @@
+from bs4 import BeautifulSoup
+
+# Metrics every CafeF scrape is expected to produce
+METRIC_KEYS = ('Price', 'MarketCap', 'EPS', 'P/E', 'P/B')
+
+
+def _text(element):
+    return element.get_text(strip=True) if element else ''
+
+
+def parse_primary_layout(soup):
+    """Read metrics from the ``price__0`` / ``dlt-left-half`` page layout."""
+    metrics = {'Price': _text(soup.find(id='price__0'))}
+
+    # Market cap is the 4th row of the 3rd dltl-other block
+    dltl_other_elements = soup.select('.dltl-other')
+    if len(dltl_other_elements) >= 3:
+        clearfix_elements = dltl_other_elements[2].select('.clearfix')
+        if len(clearfix_elements) >= 4:
+            metrics['MarketCap'] = _text(clearfix_elements[3].select_one('.r'))
+
+    # dlt-left-half blocks alternate key and value lines
+    for element in soup.select('.dlt-left-half'):
+        lines = element.get_text('\n', strip=True).split('\n')
+        for j in range(0, len(lines) - 1, 2):
+            key = lines[j].strip()
+            value = lines[j + 1].strip()
+            if "EPS" in key:
+                metrics['EPS'] = value
+            elif "P/E" in key:
+                metrics['P/E'] = value
+            elif "P/B" in key:
+                metrics['P/B'] = value
+    return metrics
+
+
+def parse_alt_layout(soup):
+    """Read metrics from the ``real-time__price`` / ``table-right-item`` page layout."""
+    metrics = {'Price': _text(soup.find(id='real-time__price'))}
+
+    table_right = soup.find(id='transaction-information-table-right')
+    rows = table_right.select('.table-right-item') if table_right else []
+
+    def get_value_from_row(index):
+        if index >= len(rows):
+            return ''
+        p_elements = rows[index].find_all('p')
+        return _text(p_elements[1]) if len(p_elements) >= 2 else ''
+
+    metrics['EPS'] = get_value_from_row(0)
+    metrics['P/E'] = get_value_from_row(2)
+    metrics['P/B'] = get_value_from_row(4)
+    metrics['MarketCap'] = get_value_from_row(5)
+    return metrics
+
+
+def is_complete(metrics):
+    """Whether every expected metric has a value."""
+    return all(metrics.get(key) for key in METRIC_KEYS)
+
+
+def parse_stock_page(html):
+    """Extract Price/EPS/P/E/P/B/MarketCap from a CafeF stock page.
+
+    Values missing from the primary layout are filled from the alternative
+    layout. Missing metrics are returned as empty strings. ``layout`` records
+    which layout supplied the values: 'primary', 'alt', 'primary+alt' or ''
+    when neither matched.
+    """
+    soup = BeautifulSoup(html, 'lxml')
+    metrics = parse_primary_layout(soup)
+    used = ['primary'] if any(metrics.get(key) for key in METRIC_KEYS) else []
+    if not is_complete(metrics):
+        filled = False
+        for key, value in parse_alt_layout(soup).items():
+            if not metrics.get(key) and value:
+                metrics[key] = value
+                filled = True
+        if filled:
+            used.append('alt')
+    result = {key: metrics.get(key, '') for key in METRIC_KEYS}
+    result['layout'] = '+'.join(used)
+    return result
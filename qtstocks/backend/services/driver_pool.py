@@ -0,0 +1,80 @@
+import queue
+import threading
+from contextlib import contextmanager
+from selenium.common.exceptions import WebDriverException, NoSuchElementException, TimeoutException
+from services.metrics import WEBDRIVER_EVENTS
+
+
+class DriverPool:
+    """Bounded pool of long-lived WebDriver sessions.
+
+    At most ``size`` browsers exist at any time. A driver is checked out for
+    one page, returned afterwards and reused by the next caller. Drivers are
+    recycled after ``max_pages`` page loads or as soon as they crash.
+    """
+
+    def __init__(self, create_driver, size=2, max_pages=50):
+        self._create_driver = create_driver
+        self._max_pages = max_pages
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle = queue.LifoQueue()
+        self._pages = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def driver(self):
+        """Check out a driver for the duration of the ``with`` block."""
+        self._slots.acquire()
+        driver = None
+        try:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                driver = self._create_driver()
+                with self._lock:
+                    self._pages[id(driver)] = 0
+            yield driver
+        except (NoSuchElementException, TimeoutException):
+            # A missing element or slow page says nothing about the browser's health
+            raise
+        except WebDriverException:
+            # The session is in an unknown state, never hand it out again
+            WEBDRIVER_EVENTS.labels('crashed').inc()
+            self._discard(driver)
+            driver = None
+            raise
+        finally:
+            if driver is not None:
+                self._release(driver)
+            self._slots.release()
+
+    def _release(self, driver):
+        with self._lock:
+            self._pages[id(driver)] = self._pages.get(id(driver), 0) + 1
+            exhausted = self._pages[id(driver)] >= self._max_pages
+        if exhausted:
+            print(f"Recycling WebDriver after {self._max_pages} pages")
+            WEBDRIVER_EVENTS.labels('recycled').inc()
+            self._discard(driver)
+        else:
+            self._idle.put(driver)
+
+    def _discard(self, driver):
+        if driver is None:
+            return
+        with self._lock:
+            self._pages.pop(id(driver), None)
+        try:
+            driver.quit()
+        except Exception as e:
+            print(f"Error quitting WebDriver: {str(e)}")
+
+    def close(self):
+        """Quit every idle driver."""
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(driver)
+
@@ -0,0 +1,133 @@
+import json
+import queue
+import select
+import threading
+import time
+import psycopg2
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+from sqlalchemy.engine import make_url
+
+# Postgres channel every process publishes to and listens on
+NOTIFY_CHANNEL = 'qtstocks_events'
+# NOTIFY payloads must stay under 8000 bytes
+MAX_NOTIFY_PAYLOAD = 7900
+
+
+class EventBroker:
+    """Fans published events out to Server-Sent Events subscribers.
+
+    Once ``init_app`` finds a Postgres database, events are sent with NOTIFY
+    and each process hands them to its own subscribers from a single LISTEN
+    connection, so a stream sees events from jobs in every gunicorn worker.
+    Otherwise events only reach subscribers in the publishing process.
+    """
+
+    def __init__(self, max_queue_size=256):
+        self._max_queue_size = max_queue_size
+        self._max_subscribers = None
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._dsn = None
+        self._notify_conn = None
+        self._notify_lock = threading.Lock()
+        self._listener = None
+
+    def init_app(self, app):
+        """Share events through the app's database and cap streams per process."""
+        self._max_subscribers = app.config['SSE_MAX_STREAMS']
+        url = make_url(app.config['SQLALCHEMY_DATABASE_URI'])
+        if url.get_backend_name() == 'postgresql':
+            # libpq doesn't know SQLAlchemy's +driver suffix
+            self._dsn = url.set(drivername='postgresql').render_as_string(hide_password=False)
+
+    def subscribe(self, user_id):
+        """Register a subscriber and return the queue its events arrive on.
+
+        Returns None when this process already serves SSE_MAX_STREAMS
+        streams, since each one holds a worker thread.
+        """
+        q = queue.Queue(maxsize=self._max_queue_size)
+        with self._lock:
+            if self._max_subscribers is not None and len(self._subscribers) >= self._max_subscribers:
+                return None
+            self._subscribers[q] = user_id
+            if self._dsn and self._listener is None:
+                self._listener = threading.Thread(target=self._listen, name='sse-listener', daemon=True)
+                self._listener.start()
+        return q
+
+    def unsubscribe(self, q):
+        with self._lock:
+            self._subscribers.pop(q, None)
+
+    def publish(self, event, data, user_id=None):
+        """Send an event to one user's subscribers, or to everyone when user_id is None."""
+        message = format_sse(event, data)
+        if self._dsn:
+            payload = json.dumps({'user_id': user_id, 'message': message})
+            if len(payload.encode('utf-8')) <= MAX_NOTIFY_PAYLOAD and self._notify(payload):
+                # Our own listener delivers it back to local subscribers
+                return
+            print(f"Delivering {event} event to this process only")
+        self._deliver(message, user_id)
+
+    def _deliver(self, message, user_id):
+        with self._lock:
+            targets = [q for q, owner in self._subscribers.items() if user_id is None or owner == user_id]
+        for q in targets:
+            try:
+                q.put_nowait(message)
+            except queue.Full:
+                # A stalled client shouldn't hold up the scraper, drop the event
+                pass
+
+    def _notify(self, payload):
+        """NOTIFY on a dedicated autocommit connection, so it's sent right away."""
+        with self._notify_lock:
+            for _ in range(2):
+                try:
+                    if self._notify_conn is None or self._notify_conn.closed:
+                        self._notify_conn = psycopg2.connect(self._dsn)
+                        self._notify_conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+                    with self._notify_conn.cursor() as cursor:
+                        cursor.execute("SELECT pg_notify(%s, %s)", (NOTIFY_CHANNEL, payload))
+                    return True
+                except psycopg2.Error as e:
+                    # Reconnect once, the connection may have been dropped while idle
+                    print(f"Error publishing event: {str(e)}")
+                    if self._notify_conn is not None:
+                        self._notify_conn.close()
+                    self._notify_conn = None
+        return False
+
+    def _listen(self):
+        """Deliver NOTIFY payloads from every process to this process's subscribers."""
+        while True:
+            conn = None
+            try:
+                conn = psycopg2.connect(self._dsn)
+                conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+                with conn.cursor() as cursor:
+                    cursor.execute(f"LISTEN {NOTIFY_CHANNEL}")
+                while True:
+                    if select.select([conn], [], [], 60) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        event = json.loads(conn.notifies.pop(0).payload)
+                        self._deliver(event['message'], event['user_id'])
+            except Exception as e:
+                print(f"Event listener error, reconnecting: {str(e)}")
+                time.sleep(5)
+            finally:
+                if conn is not None:
+                    conn.close()
+
+
+def format_sse(event, data):
+    """Encode one event in the text/event-stream wire format."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+# Shared by the scraper, the job runner and the /stocks/events stream
+broker = EventBroker()
@@ -0,0 +1,57 @@
+from datetime import datetime, time, timedelta, timezone
+from config import Config
+
+
+def _market_now(now=None):
+    """Current time in the exchanges' local time zone."""
+    now = now or datetime.utcnow()
+    return now.replace(tzinfo=timezone.utc).astimezone(timezone(timedelta(hours=Config.MARKET_UTC_OFFSET_HOURS)))
+
+
+def _parse_time(value):
+    hours, minutes = value.split(':')
+    return time(int(hours), int(minutes))
+
+
+def is_market_open(now=None):
+    """Whether the Vietnamese exchanges are in their trading session (holidays aren't tracked)."""
+    local = _market_now(now)
+    if local.weekday() >= 5:
+        return False
+    return _parse_time(Config.MARKET_OPEN) <= local.time() < _parse_time(Config.MARKET_CLOSE)
+
+
+def last_market_close(now=None):
+    """Naive UTC timestamp of the most recent session close."""
+    local = _market_now(now)
+    close = local.replace(hour=_parse_time(Config.MARKET_CLOSE).hour,
+                          minute=_parse_time(Config.MARKET_CLOSE).minute,
+                          second=0, microsecond=0)
+    if local < close:
+        close -= timedelta(days=1)
+    while close.weekday() >= 5:
+        close -= timedelta(days=1)
+    return close.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def stats_ttl(exchange):
+    """How long stats for a stock on ``exchange`` stay fresh while the market is open."""
+    minutes = Config.STATS_TTL_EXCHANGE_MINUTES.get(exchange, Config.STATS_TTL_MINUTES)
+    return timedelta(minutes=minutes)
+
+
+def is_stale(last_updated, exchange, now=None):
+    """Whether a StockStats row updated at ``last_updated`` (naive UTC) should be re-scraped.
+
+    During trading hours rows expire after the exchange TTL. Outside trading
+    hours prices can't move, so a row is fresh if it was taken after the
+    last close.
+    """
+    if last_updated is None:
+        return True
+    if last_updated.tzinfo is not None:
+        last_updated = last_updated.astimezone(timezone.utc).replace(tzinfo=None)
+    now = now or datetime.utcnow()
+    if is_market_open(now):
+        return now - last_updated > stats_ttl(exchange)
+    return last_updated < last_market_close(now)
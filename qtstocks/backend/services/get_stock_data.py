@@ -4,280 +4,498 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import WebDriverException, NoSuchElementException
+from selenium.common.exceptions import TimeoutException
 import time
-import sys
 import platform
 import requests
+from requests.adapters import HTTPAdapter
 import json
+from urllib.parse import urlsplit
 from datetime import datetime, timezone
+import atexit
 from models import Stock, StockStats
 from extensions import db
-from bs4 import BeautifulSoup
+from config import Config
+from services.driver_pool import DriverPool
+from services.cafef_parser import parse_stock_page, is_complete, METRIC_KEYS
+from services.scrape_engine import HostRateLimiter, InflightRegistry, CircuitBreaker, scrape_concurrently
+from services.scraper_errors import ScraperError, DriverStartError, ScraperUnavailableError, StockPageGoneError, NoMetricsError
+from services.freshness import is_stale
+from services.stock_urls import resolve_stock_urls, invalidate_stock_urls
+from services.events import broker
+from services.metrics import stage_timer, SCRAPE_RESULTS, WEBDRIVER_EVENTS, STATS_ROWS_WRITTEN, METRIC_PARSE_FAILURES
+from services.metric_normalizer import normalize_metrics
+from services.stats_history import record_history
+from services.scrape_locks import symbol_locks, wait_for_symbols
+
+# Requests Chrome never needs to make to read the metrics
+BLOCKED_URL_PATTERNS = [
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.svg', '*.ico',
+    '*.woff', '*.woff2', '*.ttf', '*.otf', '*.css',
+    '*.mp4', '*.webm',
+    '*googletagmanager.com*', '*google-analytics.com*', '*doubleclick.net*',
+    '*googlesyndication.com*', '*facebook.net*', '*facebook.com/tr*',
+    '*admicro.vn*', '*adnxs.com*', '*criteo.com*', '*scorecardresearch.com*'
+]
+
+# Either layout's price element, filled in by scripts once quotes arrive
+PRICE_SELECTOR = '#price__0, #real-time__price'
+
+# Statuses that mean the page itself is gone rather than CafeF having trouble
+GONE_STATUSES = (404, 410)
+
+def check_page_url(requested_url, final_url):
+    """Raise StockPageGoneError when loading ``requested_url`` ended up on another page."""
+    if urlsplit(final_url).path.rstrip('/') != urlsplit(requested_url).path.rstrip('/'):
+        raise StockPageGoneError(f"{requested_url} redirected to {final_url}")
+
+def price_rendered(driver):
+    """WebDriverWait condition: a price element exists and has text."""
+    return any(element.text.strip() for element in driver.find_elements(By.CSS_SELECTOR, PRICE_SELECTOR))
 
 class StockDataScraper:
     def __init__(self):
-        self.driver = None
+        # Long-lived browsers shared by every scrape, see DriverPool
+        self.pool = DriverPool(
+            self.create_driver,
+            size=Config.SCRAPER_POOL_SIZE,
+            max_pages=Config.SCRAPER_MAX_PAGES_PER_DRIVER
+        )
+        atexit.register(self.pool.close)
+        # Shared across worker threads so CafeF sees a bounded request rate
+        self.rate_limiter = HostRateLimiter(Config.SCRAPER_HOST_RATE_LIMIT)
+        # Symbols currently being scraped by any pull in this process
+        self.inflight = InflightRegistry()
+        # Stop launching Chrome for a while when it keeps failing to start
+        self.breaker = CircuitBreaker(
+            failure_threshold=Config.SCRAPER_BREAKER_THRESHOLD,
+            reset_timeout=Config.SCRAPER_BREAKER_RESET_SECONDS
+        )
+        # Keep-alive connections to CafeF for the search API and static page fetches
+        self.http = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=max(Config.SCRAPER_WORKERS, 10))
+        self.http.mount('https://', adapter)
+        self.http.mount('http://', adapter)
+        self.http.headers.update({
+            'user-agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/134.0.0.0 Safari/537.36'
+        })
 
     def create_driver(self):
-        """Create and configure a Chrome WebDriver instance."""
+        """Create a Chrome WebDriver instance, retrying with exponential backoff.
+
+        Raises ScraperUnavailableError while the circuit breaker is open and
+        DriverStartError when every attempt fails. Never exits the process.
+        """
+        if not self.breaker.allow():
+            raise ScraperUnavailableError("Chrome keeps failing to start, browser scraping is paused")
+
+        attempts = Config.SCRAPER_DRIVER_RETRIES + 1
+        for attempt in range(attempts):
+            try:
+                driver = self._start_chrome()
+                self.breaker.record_success()
+                WEBDRIVER_EVENTS.labels('started').inc()
+                return driver
+            except Exception as e:
+                print(f"Error creating WebDriver (attempt {attempt + 1}/{attempts}): {str(e)}")
+                WEBDRIVER_EVENTS.labels('start_failed').inc()
+                last_error = e
+                if attempt + 1 < attempts:
+                    time.sleep(Config.SCRAPER_DRIVER_BACKOFF_SECONDS * 2 ** attempt)
+
+        self.breaker.record_failure()
+        raise DriverStartError(f"Could not start Chrome: {str(last_error)}") from last_error
+
+    def _start_chrome(self):
+        """Launch and configure one Chrome WebDriver instance."""
+        chrome_options = Options()
+        chrome_options.add_argument('--headless')  # Run in headless mode
+        chrome_options.add_argument('--no-sandbox')
+        chrome_options.add_argument('--disable-dev-shm-usage')
+        # Return from driver.get at DOMContentLoaded instead of waiting for every subresource
+        chrome_options.page_load_strategy = 'eager'
+        chrome_options.add_argument('--blink-settings=imagesEnabled=false')
+        chrome_options.add_argument('--disable-extensions')
+        chrome_options.add_argument('--mute-audio')
+        chrome_options.add_experimental_option('prefs', {
+            'profile.managed_default_content_settings.images': 2,
+            'profile.managed_default_content_settings.fonts': 2,
+            'profile.managed_default_content_settings.notifications': 2
+        })
+        
+        driver = webdriver.Chrome(options=chrome_options)
         try:
-            chrome_options = Options()
-            chrome_options.add_argument('--headless')  # Run in headless mode
-            chrome_options.add_argument('--no-sandbox')
-            chrome_options.add_argument('--disable-dev-shm-usage')
-            
-            self.driver = webdriver.Chrome(options=chrome_options)
-            return self.driver
-        except Exception as e:
-            print(f"Error creating WebDriver: {str(e)}")
-            sys.exit(1)
+            driver.set_page_load_timeout(Config.SCRAPER_PAGE_LOAD_TIMEOUT)
+            # Block stylesheets, media and third-party trackers at the network layer
+            driver.execute_cdp_cmd('Network.enable', {})
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {
+                'urls': BLOCKED_URL_PATTERNS + Config.SCRAPER_BLOCKED_URLS
+            })
+        except Exception:
+            driver.quit()
+            raise
+        return driver
+
+    def search_stock_url(self, stock_symbol):
+        """Look up the stock details URL with the CafeF search API.
+
+        Returns None when CafeF doesn't know the symbol and raises on
+        network or response errors, so callers can tell the two apart.
+        """
+        # Use the search API to get stock details
+        search_url = f"{Config.CAFEF_SEARCH_URL}?keyword={stock_symbol}"
+        print(f"Searching for stock: {stock_symbol}")
+        
+        # Make API request
+        self.rate_limiter.wait(search_url)
+        with stage_timer('search'):
+            response = self.http.get(search_url, timeout=Config.SCRAPER_HTTP_TIMEOUT)
+            response.raise_for_status()
+            data = json.loads(response.text)
+        
+        # Get the redirectUrl from the first document
+        if data and isinstance(data, dict) and 'value' in data:
+            value = data['value']
+            if value and 'documents' in value and len(value['documents']) > 0:
+                redirect_url = value['documents'][0]['document']['redirectUrl']
+                if redirect_url:
+                    return f"{Config.CAFEF_BASE_URL}{redirect_url}"
+        return None
 
     def get_stock_url(self, stock_symbol):
         """Get the stock details URL using CafeF search API."""
         try:
-            # Use the search API to get stock details
-            search_url = f"https://search.cafef.vn/api/searching/v1/Companies/SearchByKeyWord?keyword={stock_symbol}"
-            print(f"Searching for stock: {stock_symbol}")
-            
-            # Make API request
-            response = requests.get(search_url)
-            data = json.loads(response.text)
-            
-            # Get the redirectUrl from the first document
-            if data and isinstance(data, dict) and 'value' in data:
-                value = data['value']
-                if value and 'documents' in value and len(value['documents']) > 0:
-                    redirect_url = value['documents'][0]['document']['redirectUrl']
-                    if redirect_url:
-                        return f"https://cafef.vn{redirect_url}"
-            
-            raise Exception(f"Stock symbol {stock_symbol} not found in search results")
-            
+            stock_url = self.search_stock_url(stock_symbol)
+            if not stock_url:
+                raise Exception(f"Stock symbol {stock_symbol} not found in search results")
+            return stock_url
         except Exception as e:
             print(f"Error finding stock URL: {str(e)}")
             return None
 
-    def scrape_stock_data_with_driver(self, stock_symbol):
-        metrics_map = {}
+    def resolve_urls(self, symbols, refresh=False):
+        """Map symbols to CafeF URLs through the persistent cache, searching only on misses."""
+        return resolve_stock_urls(symbols, self.search_stock_url, Config.SCRAPER_WORKERS, refresh=refresh)
+
+    def scrape_stock_data_with_http(self, stock_symbol, stock_url=None):
+        """Fetch the stock page without a browser and parse it with BeautifulSoup."""
+        stock_url = stock_url or self.get_stock_url(stock_symbol)
+        if not stock_url:
+            raise Exception(f"Could not find URL for stock symbol {stock_symbol}")
+        
+        self.rate_limiter.wait(stock_url)
+        with stage_timer('http_fetch'):
+            response = self.http.get(stock_url, timeout=Config.SCRAPER_HTTP_TIMEOUT)
+            if response.status_code in GONE_STATUSES:
+                raise StockPageGoneError(f"{stock_url} returned {response.status_code}")
+            response.raise_for_status()
+        check_page_url(stock_url, response.url)
+        
+        with stage_timer('http_extract'):
+            metrics_map = parse_stock_page(response.text)
+        metrics_map['id'] = stock_symbol
+        print(metrics_map)
+        return metrics_map
+
+    def scrape_stock_data_with_driver(self, stock_symbol, stock_url=None):
+        """Load the stock page once in a browser and parse both known layouts from it."""
         try:
             # Get the stock details URL
-            stock_url = self.get_stock_url(stock_symbol)
+            stock_url = stock_url or self.get_stock_url(stock_symbol)
             print(stock_url)
             if not stock_url:
                 raise Exception(f"Could not find URL for stock symbol {stock_symbol}")
             
-            # Create a new local Chrome session
-            driver = self.create_driver()
-            
-            # Visit the stock URL using the new Selenium WebDriver session
-            driver.get(stock_url)
-            
-            # Get the stock price
-            try:
-                price_element = driver.find_element(By.ID, 'price__0')
-                if price_element:
-                    metrics_map['Price'] = price_element.text.strip()
-            except NoSuchElementException:
-                print(f"Could not find price element for {stock_symbol}")
-                metrics_map['Price'] = ''
-                
-            # Get the market cap
-            try:
-                dltl_other_elements = driver.find_elements(By.CLASS_NAME, 'dltl-other')
-                if len(dltl_other_elements) >= 3:  # Make sure we have at least 3 elements
-                    market_cap_element = dltl_other_elements[2]  # Get the 3rd element (index 2)
-                    clearfix_elements = market_cap_element.find_elements(By.CLASS_NAME, 'clearfix')
-                    if len(clearfix_elements) >= 4:  # Make sure we have at least 4 clearfix elements
-                        clearfix_element = clearfix_elements[3]  # Get the 4th element (index 3)
-                        value_element = clearfix_element.find_element(By.CLASS_NAME, 'r')
-                        if value_element:
-                            metrics_map['MarketCap'] = value_element.text.strip()
-            except NoSuchElementException:
-                print(f"Could not find market cap element for {stock_symbol}")
-                metrics_map['MarketCap'] = ''
-            
-            # Find all elements with class dlt-left-half
-            metrics_elements = driver.find_elements(By.CLASS_NAME, "dlt-left-half")
-            
-            # Process each element to find metrics
-            for element in metrics_elements:
-                text = element.text.strip()
-                lines = text.split('\n')
-                # Process pairs of lines (key, value)
-                for j in range(0, len(lines), 2):
-                    if j + 1 < len(lines):  # Make sure we have both key and value
-                        key = lines[j].strip()
-                        value = lines[j + 1].strip()
-                        # Store metrics we're interested in
-                        if "EPS" in key:
-                            metrics_map['EPS'] = value
-                        elif "P/E" in key:
-                            metrics_map['P/E'] = value
-                        elif "P/B" in key:
-                            metrics_map['P/B'] = value
+            # Borrow a browser from the pool and visit the stock URL
+            with self.pool.driver() as driver:
+                self.rate_limiter.wait(stock_url)
+                with stage_timer('page_load'):
+                    driver.get(stock_url)
+                check_page_url(stock_url, driver.current_url)
+                # Wait for the price instead of the full page load, then parse whatever is there
+                try:
+                    with stage_timer('render_wait'):
+                        WebDriverWait(driver, Config.SCRAPER_ELEMENT_TIMEOUT).until(price_rendered)
+                except TimeoutException:
+                    print(f"Timed out waiting for price of {stock_symbol}")
+                with stage_timer('page_source'):
+                    # The rendered DOM holds the values scripts filled in after load
+                    page_source = driver.page_source
                 
         except Exception as e:
             print(f"An error occurred while scraping {stock_symbol}: {str(e)}")
             raise
         
-        metrics_map['EPS'] = metrics_map.get('EPS', '')
-        metrics_map['P/E'] = metrics_map.get('P/E', '')
-        metrics_map['P/B'] = metrics_map.get('P/B', '')
-        metrics_map['MarketCap'] = metrics_map.get('MarketCap', '')
-        
+        with stage_timer('extract'):
+            metrics_map = parse_stock_page(page_source)
         metrics_map['id'] = stock_symbol
         print(metrics_map)
         return metrics_map
     
 
-    def clean_number(self, value):
-        """Clean and convert a string number to float."""
-        if not value:
-            return None
-        # Keep only digits, dots, and commas
-        cleaned = ''.join(c for c in value if c.isdigit() or c in '.,')
-        # Convert comma decimal separator to dot
-        cleaned = cleaned.replace(',', '.')
-        try:
-            return float(cleaned)
-        except ValueError:
-            return None
+    def scrape_symbol(self, symbol, stock_url=None):
+        """Scrape one symbol.
 
-    def scrape_stock_data_with_driver_alt(self, stock_symbol):
-        """Alternative method to scrape stock data using a different approach."""
-        metrics_map = {}
+        In 'auto' mode the static HTML is tried first and a browser is only
+        used when it lacks some values. Runs on scraper worker threads, so it
+        must not touch the database.
+        """
+        print(f"\nProcessing stock symbol: {symbol}")
         try:
-            # Get the stock details URL
-            stock_url = self.get_stock_url(stock_symbol)
-            print(stock_url)
-            if not stock_url:
-                raise Exception(f"Could not find URL for stock symbol {stock_symbol}")
-            
-            # Create a new local Chrome session
-            driver = self.create_driver()
-            
-            # Visit the stock URL using the new Selenium WebDriver session
-            driver.get(stock_url)
-            
-               # Get the stock price
+            metrics, source = self._scrape_symbol(symbol, stock_url)
+        except Exception:
+            SCRAPE_RESULTS.labels('failure', 'none', '').inc()
+            raise
+        # A timeout, interstitial or new layout parses to all-empty values;
+        # saving those would blank the stored stats and look fresh
+        if not any(metrics.get(key) for key in METRIC_KEYS):
+            SCRAPE_RESULTS.labels('failure', source, '').inc()
+            raise NoMetricsError(f"No metrics found on the page for {symbol}")
+        # Needing the browser or the alternative layout counts as a fallback
+        fell_back = (source == 'selenium' and Config.SCRAPER_MODE != 'selenium') or 'alt' in metrics['layout']
+        SCRAPE_RESULTS.labels('fallback' if fell_back else 'success', source, metrics['layout']).inc()
+        return metrics
+
+    def _scrape_symbol(self, symbol, stock_url):
+        """Return ``(metrics, source)`` where source is 'http' or 'selenium'."""
+        http_metrics = None
+        if Config.SCRAPER_MODE in ('auto', 'http'):
             try:
-                price_element = driver.find_element(By.ID, 'real-time__price')
-                if price_element:
-                    metrics_map['Price'] = price_element.text.strip()
-            except NoSuchElementException:
-                print(f"Could not find price element for {stock_symbol}")
-                metrics_map['Price'] = ''
-                
-            table_right = driver.find_element(By.ID, 'transaction-information-table-right')
-            table_right_rows = table_right.find_elements(By.CLASS_NAME, 'table-right-item')
-            
-            def get_value_from_row(row):
-                p_elements = row.find_elements(By.TAG_NAME, 'p')
-                if len(p_elements) >= 2:
-                    return p_elements[1].text.strip()
-                return ''
-            
-            eps_row = table_right_rows[0]
-            pe_row = table_right_rows[2]
-            pb_row = table_right_rows[4]
-            market_cap_row = table_right_rows[5]
-            
-            metrics_map['EPS'] = get_value_from_row(eps_row)
-            metrics_map['P/E'] = get_value_from_row(pe_row)
-            metrics_map['P/B'] = get_value_from_row(pb_row)
-            metrics_map['MarketCap'] = get_value_from_row(market_cap_row)
-            metrics_map['id'] = stock_symbol
-            print(metrics_map)
-            return metrics_map
-            
-        except Exception as e:
-            print(f"Error in scrape_stock_data_with_driver_alt: {str(e)}")
+                http_metrics = self.scrape_stock_data_with_http(symbol, stock_url)
+                if Config.SCRAPER_MODE == 'http' or is_complete(http_metrics):
+                    return http_metrics, 'http'
+                print(f"Static HTML incomplete for {symbol}, falling back to Selenium")
+            except requests.exceptions.RequestException as e:
+                if Config.SCRAPER_MODE == 'http':
+                    raise
+                print(f"HTTP fetch failed for {symbol}, falling back to Selenium: {str(e)}")
+
+        try:
+            metrics = self.scrape_stock_data_with_driver(symbol, stock_url)
+        except StockPageGoneError:
             raise
+        except ScraperError as e:
+            # Without a browser, partial static values beat no values
+            if http_metrics and any(http_metrics.get(key) for key in METRIC_KEYS):
+                print(f"Browser unavailable for {symbol}, keeping static HTML values: {str(e)}")
+                return http_metrics, 'http'
+            raise
+        print(f"Scraped {symbol} using layout '{metrics['layout']}'")
+        return metrics, 'selenium'
+
+    def metrics_to_rows(self, batch):
+        """Convert ``[(symbol, metrics), ...]`` into StockStats rows in one pass."""
+        rows, failures = normalize_metrics(batch)
+        for symbol, columns in failures.items():
+            print(f"Could not parse {', '.join(columns)} for {symbol}")
+            for column in columns:
+                METRIC_PARSE_FAILURES.labels(column).inc()
+        last_updated = datetime.now(timezone.utc)
+        for row in rows:
+            row['last_updated'] = last_updated
+        return rows
+
+    def metrics_to_row(self, symbol, metrics):
+        """Convert scraped metric strings into StockStats column values."""
+        return self.metrics_to_rows([(symbol, metrics)])[0]
+
+    def save_metrics(self, symbol, metrics, current_user):
+        """Merge scraped metrics for one symbol into StockStats."""
+        # Find or create StockStats for this stock
+        stats = StockStats.query.filter_by(symbol=symbol).first()
+        if not stats:
+            stats = StockStats(symbol=symbol)
+            db.session.add(stats)
+
+        row = self.metrics_to_row(symbol, metrics)
+        for column, value in row.items():
+            setattr(stats, column, value)
+        # Append the new values to the history
+        record_history([row])
         
+        # Add the stock to the user's stock_stats relationship
+        if stats not in current_user.stock_stats:
+            current_user.stock_stats.append(stats)
+
+        # Commit the changes
+        with stage_timer('db_commit'):
+            db.session.commit()
+        STATS_ROWS_WRITTEN.inc()
+        # Only the user whose pull this is tracks the symbol
+        broker.publish('stats', {
+            'symbol': symbol,
+            'name': stats.stock.name if stats.stock else None,
+            'icon': stats.stock.icon if stats.stock else None,
+            'exchange': stats.stock.exchange if stats.stock else None,
+            'last_updated': stats.last_updated.strftime('%Y-%m-%d %H:%M:%S'),
+            'price': stats.price,
+            'market_cap': stats.market_cap,
+            'eps': stats.eps,
+            'pe': stats.pe,
+            'pb': stats.pb
+        }, user_id=current_user.id)
+        print(f"Successfully updated metrics for {symbol}:")
+        print(f"  Price: {stats.price}")
+        print(f"  Market Cap: {stats.market_cap}")
+        print(f"  EPS: {stats.eps}")
+        print(f"  P/E: {stats.pe}")
+        print(f"  P/B: {stats.pb}")
         
-    def process_stock_list(self, symbols, current_user):
-        """Process a list of stock symbols and update their data in the database."""
-        self.driver = self.create_driver()
-        
+    def _scrape_and_save(self, symbols, current_user, report):
+        """Scrape symbols this pull owns and merge each result as it lands."""
+        # Resolve page URLs up front so workers make no search calls
+        urls = self.resolve_urls(symbols)
+        for symbol in symbols:
+            if not urls.get(symbol):
+                print(f"Stock symbol {symbol} not found in search results")
+                self.inflight.resolve(symbol, False)
+                report(symbol, False)
+        symbols = [symbol for symbol in symbols if urls.get(symbol)]
+
+        gone_symbols = []
+        results = scrape_concurrently(
+            symbols,
+            lambda symbol: self.scrape_symbol(symbol, urls[symbol]),
+            Config.SCRAPER_WORKERS
+        )
+        for symbol, metrics, error in results:
+            if error:
+                print(f"Error processing stock {symbol}: {str(error)}")
+                if isinstance(error, StockPageGoneError):
+                    gone_symbols.append(symbol)
+                self.inflight.resolve(symbol, False)
+                report(symbol, False)
+                continue
+
+            try:
+                self.save_metrics(symbol, metrics, current_user)
+                self.inflight.resolve(symbol, True)
+                report(symbol, True)
+            except Exception as e:
+                print(f"Error saving metrics for {symbol}: {str(e)}")
+                db.session.rollback()
+                self.inflight.resolve(symbol, False)
+                report(symbol, False)
+                continue
+
+        # These pages moved, search again next time. Other failures (timeouts,
+        # no browser) say nothing about the URL, so its cache entry is kept
+        invalidate_stock_urls(gone_symbols)
+
+    def _adopt_stats(self, stats, current_user):
+        """Add stats another pull refreshed to this user's list."""
+        if stats and stats not in current_user.stock_stats:
+            current_user.stock_stats.append(stats)
+            db.session.commit()
+
+    def _await_other_processes(self, symbols, current_user, report):
+        """Wait for pulls in other processes to finish owned symbols, then resolve them here."""
+        before = dict(
+            db.session.query(StockStats.symbol, StockStats.last_updated)
+            .filter(StockStats.symbol.in_(symbols))
+            .all()
+        )
+        db.session.commit()
+        released = wait_for_symbols(symbols, Config.SCRAPER_COALESCE_TIMEOUT)
+        for symbol in symbols:
+            stats = db.session.query(StockStats).filter_by(symbol=symbol).populate_existing().first()
+            # The other pull may have failed; only a newer row counts as refreshed
+            ok = symbol in released and stats is not None and stats.last_updated != before.get(symbol)
+            self._adopt_stats(stats if ok else None, current_user)
+            self.inflight.resolve(symbol, ok)
+            report(symbol, ok)
+
+    def process_stock_list(self, symbols, current_user, on_result=None):
+        """Process a list of stock symbols and update their data in the database.
+
+        Symbols are scraped concurrently by SCRAPER_WORKERS threads; results
+        are merged into the database here, on the calling thread. Symbols
+        another pull is scraping, in this process or another one, are
+        awaited instead. ``on_result(symbol, ok)`` is called once per symbol
+        as it finishes.
+        """
+        def report(symbol, ok):
+            if on_result:
+                on_result(symbol, ok)
+
         try:
+            # Skip symbols we don't know about, or that are delisted, before spending a browser on them
+            known_symbols = {
+                symbol for (symbol,) in
+                db.session.query(Stock.symbol)
+                .filter(Stock.symbol.in_(symbols), Stock.delisted_at.is_(None))
+                .all()
+            }
             for symbol in symbols:
+                if symbol not in known_symbols:
+                    print(f"Stock {symbol} not found in database or delisted")
+                    report(symbol, False)
+            to_scrape = [symbol for symbol in dict.fromkeys(symbols) if symbol in known_symbols]
+
+            # Symbols another pull is already scraping are awaited rather than scraped twice
+            owned, waiting = self.inflight.claim(to_scrape)
+            try:
+                with symbol_locks(owned) as (locked, busy):
+                    self._scrape_and_save(locked, current_user, report)
+                if busy:
+                    self._await_other_processes(busy, current_user, report)
+            finally:
+                for symbol in owned:
+                    self.inflight.resolve(symbol, False)
+
+            for symbol, future in waiting.items():
                 try:
-                    print(f"\nProcessing stock symbol: {symbol}")
-                    metrics = self.scrape_stock_data_with_driver(symbol)
-                    
-                    # Check if any metrics values are empty
-                    if any(not value for value in metrics.values()):
-                        print(f"No metrics found for {symbol}, trying alternative method")
-                        metrics = self.scrape_stock_data_with_driver_alt(symbol)
-                        
-                    if not metrics:
-                        print(f"No metrics found for {symbol}")
-                        continue
-
-                    # Find the stock in database
-                    stock = Stock.query.filter_by(symbol=symbol).first()
-                    if not stock:
-                        print(f"Stock {symbol} not found in database")
-                        continue
-
-                    # Find or create StockStats for this stock
-                    stats = StockStats.query.filter_by(symbol=symbol).first()
-                    if not stats:
-                        stats = StockStats(symbol=symbol)
-                        db.session.add(stats)
-
-                    # Convert and update metrics
-                    try:
-                        # Remove any spaces and commas from numbers
-                        price_str = metrics.get('Price', '').replace(',', '').replace(' ', '')
-                        market_cap_str = metrics.get('MarketCap', '').replace(',', '').replace(' ', '')
-                        eps_str = metrics.get('EPS', '').replace(',', '').replace(' ', '')
-                        pe_str = metrics.get('P/E', '').replace(',', '').replace(' ', '')
-                        pb_str = metrics.get('P/B', '').replace(',', '').replace(' ', '')
-
-                        # Convert to float, handling empty strings
-                        stats.price = self.clean_number(price_str)
-                        stats.market_cap = self.clean_number(market_cap_str)
-                        stats.eps = self.clean_number(eps_str)
-                        stats.pe = self.clean_number(pe_str)
-                        stats.pb = self.clean_number(pb_str)
-                        stats.last_updated = datetime.now(timezone.utc)
-                        
-                        # Add the stock to the user's stock_stats relationship
-                        current_user.stock_stats.append(stats)
-
-                        # Commit the changes
-                        db.session.commit()
-                        print(f"Successfully updated metrics for {symbol}:")
-                        print(f"  Price: {stats.price}")
-                        print(f"  Market Cap: {stats.market_cap}")
-                        print(f"  EPS: {stats.eps}")
-                        print(f"  P/E: {stats.pe}")
-                        print(f"  P/B: {stats.pb}")
-
-                    except ValueError as ve:
-                        print(f"Error converting metrics for {symbol}: {str(ve)}")
-                        db.session.rollback()
-                        continue
-
-                except Exception as e:
-                    print(f"Error processing stock {symbol}: {str(e)}")
-                    db.session.rollback()
-                    continue
+                    ok = future.result(timeout=Config.SCRAPER_COALESCE_TIMEOUT)
+                except Exception:
+                    ok = False
+                stats = db.session.get(StockStats, symbol) if ok else None
+                self._adopt_stats(stats, current_user)
+                report(symbol, stats is not None)
 
         except Exception as e:
             print(f"Error in process_stock_list: {str(e)}")
             db.session.rollback()
             raise
-        finally:
-            if self.driver:
-                self.driver.quit()
 
 # Create a singleton instance
 scraper = StockDataScraper()
 
 # Function to be called from app.py
-def process_stock_list(symbols, current_user):
+def process_stock_list(symbols, current_user, on_result=None):
     """Wrapper function to maintain backward compatibility."""
-    return scraper.process_stock_list(symbols, current_user)
+    return scraper.process_stock_list(symbols, current_user, on_result=on_result)
+
+def pull_stock_stats(symbols, current_user, load_latest_data=False, on_result=None):
+    """Attach stats for ``symbols`` to the user, scraping the ones we need.
+
+    Existing StockStats rows are reused as-is, except that with
+    ``load_latest_data`` rows past their freshness TTL (see
+    services.freshness) are scraped again. Symbols without stats are
+    always scraped.
+    """
+    existing = db.session.query(StockStats, Stock.exchange)\
+        .join(Stock, Stock.symbol == StockStats.symbol)\
+        .filter(StockStats.symbol.in_(symbols))\
+        .all()
+    now = datetime.utcnow()
+    reusable = {
+        stats.symbol: stats for stats, exchange in existing
+        if not load_latest_data or not is_stale(stats.last_updated, exchange, now)
+    }
+    request_new_symbols = [symbol for symbol in symbols if symbol not in reusable]
+    print(f"Reusing fresh stats for {len(reusable)} symbols, scraping {len(request_new_symbols)}")
+    
+    # Add any existing symbols to user's stock_stats if not already present
+    for stats in reusable.values():
+        if stats not in current_user.stock_stats:
+            current_user.stock_stats.append(stats)
+            
+    db.session.commit()
+    if on_result:
+        for symbol in reusable:
+            on_result(symbol, True)
+    return process_stock_list(request_new_symbols, current_user, on_result=on_result)
+
+def prewarm_stock_urls(symbols):
+    """Resolve and cache CafeF URLs for symbols that aren't cached yet."""
+    return scraper.resolve_urls(symbols)
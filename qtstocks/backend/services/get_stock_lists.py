@@ -1,53 +1,111 @@
 import requests
 import json
-import pandas as pd
-import odf
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from models import Stock, db
-def get_stock_list():
-    url = 'https://scanner.tradingview.com/vietnam/scan?label-product=markets-screener'
-    
-    headers = {
-        'accept': 'application/json',
-        'user-agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/134.0.0.0 Safari/537.36'
-    }
-    
+from flask import current_app
+from sqlalchemy import or_, literal_column, update, values, column as sql_column, String, Float
+from sqlalchemy.dialects.postgresql import insert
+from config import Config
+from models import Stock, StockStats, db
+from services.stock_changes import STOCK_COLUMNS, diff_stocks, mark_delisted, update_market_caps
+from services.events import broker
+from services.autocomplete import suggestions
+SCANNER_URL = 'https://scanner.tradingview.com/vietnam/scan?label-product=markets-screener'
+
+SCANNER_HEADERS = {
+    'accept': 'application/json',
+    'user-agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/134.0.0.0 Safari/537.36'
+}
+
+# Scanner columns, in the order they come back in each row's "d" list
+SCANNER_COLUMNS = [
+    "name", "description", "logoid", "update_mode", "type", "market_cap_basic", "close", "volume", "sector"
+]
+
+# TradingView quotes VND, CafeF (and so StockStats.price) quotes thousands of VND
+PRICE_DIVISOR = 1000
+
+class PartialStockListError(Exception):
+    """TradingView has more stocks than TRADINGVIEW_MAX_ROWS lets us fetch."""
+
+def fetch_scanner_page(offset, limit):
+    """POST one scanner request and return the decoded JSON."""
     data = {
-        "columns": [
-            "name", "description", "logoid", "update_mode", "type", "market_cap_basic"
-        ],
+        "columns": SCANNER_COLUMNS,
         "ignore_unknown_fields": False,
         "options": {"lang": "vi"},
-        "range": [0, 2000],
+        "range": [offset, offset + limit],
+        # Sort on a unique key so pages don't overlap or skip rows
         "sort": {"sortBy": "name", "sortOrder": "desc"},
         "preset": "all_stocks"
     }
-    
+    response = requests.post(SCANNER_URL, headers=SCANNER_HEADERS, json=data, timeout=Config.TRADINGVIEW_TIMEOUT)
+    response.raise_for_status()  # Raise an exception for bad status codes
+    return response.json()
+
+def parse_scanner_rows(result):
+    """Turn scanner rows into stock dicts, keeping regular stocks only."""
+    stocks_data = []
+    for item in result.get('data') or []:
+        d = dict(zip(SCANNER_COLUMNS, item['d']))
+        # Only include regular stocks (exclude ETFs and funds)
+        if d['type'] == 'stock':
+            stocks_data.append({
+                'symbol': d['name'],
+                'name': d['description'],
+                'icon': f'https://s3-symbol-logo.tradingview.com/{d["logoid"]}.svg',
+                'exchange': item['s'].split(':')[0],
+                'market_cap': int(d['market_cap_basic'] / 1000000) if d['market_cap_basic'] else 0,
+                'sector': d['sector'],
+                'price': d['close'] / PRICE_DIVISOR if d['close'] is not None else None,
+                'volume': d['volume']
+            })
+    return stocks_data
+
+def iter_stock_pages():
+    """Yield parsed stock lists page by page as they arrive.
+
+    The first page tells us totalCount; the remaining pages are fetched on
+    TRADINGVIEW_WORKERS threads and yielded in completion order. Fetch
+    errors are raised, after the pages that did arrive were yielded, and so
+    is PartialStockListError when totalCount is over TRADINGVIEW_MAX_ROWS.
+    """
+    page_size = min(Config.TRADINGVIEW_PAGE_SIZE, Config.TRADINGVIEW_MAX_ROWS)
+    first = fetch_scanner_page(0, page_size)
+    if 'data' not in first:
+        print("No data found in response")
+        return
+    yield parse_scanner_rows(first)
+
+    available = first.get('totalCount') or 0
+    total = min(available, Config.TRADINGVIEW_MAX_ROWS)
+    offsets = range(page_size, total, page_size)
+    if offsets:
+        executor = ThreadPoolExecutor(max_workers=max(1, Config.TRADINGVIEW_WORKERS), thread_name_prefix='tradingview')
+        try:
+            futures = [executor.submit(fetch_scanner_page, offset, min(page_size, total - offset)) for offset in offsets]
+            for future in as_completed(futures):
+                yield parse_scanner_rows(future.result())
+        finally:
+            # Also runs when the consumer stops early, don't fetch pages nobody reads
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    if available > total:
+        raise PartialStockListError(
+            f"TradingView lists {available} stocks, only the first {total} were fetched (TRADINGVIEW_MAX_ROWS)"
+        )
+
+def get_stock_list():
+    """Fetch the whole stock universe as one list."""
+    stocks_data = []
     try:
-        response = requests.post(url, headers=headers, json=data)
-        response.raise_for_status()  # Raise an exception for bad status codes
-        # Parse the JSON response
-        result = response.json()
-        # Extract stock data from the response
-        if 'data' in result:
-            stocks_data = []
-            for item in result['data']:
-                d = item['d']
-                # Only include regular stocks (exclude ETFs and funds)
-                if d[4] == 'stock':
-                    stock_info = {
-                        'symbol': d[0],
-                        'name': d[1],
-                        'icon': f'https://s3-symbol-logo.tradingview.com/{d[2]}.svg',
-                        'exchange': item['s'].split(':')[0],
-                        'market_cap': int(d[5] / 1000000) if d[5] else 0
-                    }
-                    stocks_data.append(stock_info)
-            return stocks_data
-        else:
-            print("No data found in response")
-            return []
-            
+        for page in iter_stock_pages():
+            stocks_data.extend(page)
+        return stocks_data
+    except PartialStockListError as e:
+        print(str(e))
+        return stocks_data
     except requests.exceptions.RequestException as e:
         print(f"Error making request: {e}")
         return []
@@ -55,52 +113,156 @@ def get_stock_list():
         print(f"Error parsing JSON response: {e}")
         return []
 
-def save_to_database(stocks_data):
+def save_to_database(stocks_data, chunk_size=1000):
+    """Write the rows whose content hash changed and log what changed.
+
+    Stored hashes are read in one query per chunk; only new or changed rows
+    go into the INSERT ... ON CONFLICT DO UPDATE, and only the rows it
+    returns get their StockChange entries. Market caps that moved are
+    written separately. Returns ``{'inserted', 'updated', 'unchanged',
+    'changes', 'market_caps', 'quotes'}`` counts, or None when the write
+    failed.
+    """
+    # ON CONFLICT can't touch the same row twice in one statement
+    rows = list({stock_info['symbol']: stock_info for stock_info in stocks_data}.values())
+    counts = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'changes': 0, 'market_caps': 0, 'quotes': 0}
     try:
-        # Process each stock
-        for stock_info in stocks_data:
-            # Check if stock already exists
-            stock = Stock.query.filter_by(symbol=stock_info['symbol']).first()
-            if stock:
-                # Update existing stock
-                stock.name = stock_info['name']
-                stock.icon = stock_info['icon']
-                stock.exchange = stock_info['exchange']
-                stock.market_cap = stock_info['market_cap']
-                stock.last_updated = datetime.now()
-            else:
-                # Create new stock
-                stock = Stock(
-                    symbol=stock_info['symbol'],
-                    name=stock_info['name'],
-                    icon=stock_info['icon'],
-                    exchange=stock_info['exchange'],
-                    market_cap=stock_info['market_cap'],
-                    last_updated=datetime.now()
-                )
-                db.session.add(stock)
-            
-        # Commit all changes
+        now = datetime.now()
+        for i in range(0, len(rows), chunk_size):
+            chunk = rows[i:i + chunk_size]
+            changed, changes, unchanged, market_caps = diff_stocks(chunk)
+            counts['unchanged'] += unchanged
+            if changed:
+                stmt = insert(Stock).values([
+                    dict({column: row[column] for column in STOCK_COLUMNS},
+                         symbol=row['symbol'], market_cap=row['market_cap'], content_hash=row['content_hash'],
+                         delisted_at=None, last_updated=now)
+                    for row in changed
+                ])
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[Stock.symbol],
+                    set_=dict(
+                        {column: stmt.excluded[column] for column in STOCK_COLUMNS + ('content_hash', 'delisted_at', 'last_updated')}
+                    ),
+                    # Guards against a concurrent refresh having written the same content already
+                    where=or_(Stock.content_hash.is_distinct_from(stmt.excluded.content_hash), Stock.delisted_at.isnot(None))
+                ).returning(Stock.symbol, literal_column('xmax = 0').label('inserted'))
+                # xmax is 0 only for fresh inserts
+                written = {row.symbol: row.inserted for row in db.session.execute(stmt)}
+                counts['inserted'] += sum(1 for inserted in written.values() if inserted)
+                counts['updated'] += sum(1 for inserted in written.values() if not inserted)
+                counts['unchanged'] += len(changed) - len(written)
+                # Rows the WHERE skipped were written by someone else, who logged them
+                changes = [change for change in changes if change.symbol in written]
+                db.session.add_all(changes)
+                counts['changes'] += len(changes)
+            market_cap_count = update_market_caps(market_caps)
+            counts['market_caps'] += market_cap_count
+            counts['changes'] += market_cap_count
+            counts['quotes'] += update_stats_quotes(chunk)
+
         db.session.commit()
-        print(f"Successfully saved {len(stocks_data)} stocks to database")
-        return True
+        print(f"Saved {len(rows)} stocks to database: {counts}")
+        return counts
             
     except Exception as e:
         print(f"Error saving to database: {e}")
-        if 'db' in locals():
-            db.session.rollback()
-        return False
+        db.session.rollback()
+        return None
+
+def update_stats_quotes(stocks_data):
+    """Store TradingView's price and volume on existing StockStats rows.
+
+    They go to quote_price/volume/quoted_at, so the CafeF price, the metrics
+    and the history stay one consistent scrape, and only rows whose quote
+    changed are written. Rows are not created here: a stats row with only a
+    quote would look complete to pull_stock_stats. Returns the number of
+    rows updated.
+    """
+    quotes = [
+        (stock_info['symbol'], stock_info['price'], stock_info['volume'])
+        for stock_info in stocks_data if stock_info.get('price') is not None
+    ]
+    if not quotes:
+        return 0
+    incoming = values(
+        sql_column('symbol', String), sql_column('price', Float), sql_column('volume', Float),
+        name='incoming'
+    ).data(quotes)
+    result = db.session.execute(
+        update(StockStats)
+        .where(
+            StockStats.symbol == incoming.c.symbol,
+            or_(
+                StockStats.quote_price.is_distinct_from(incoming.c.price),
+                StockStats.volume.is_distinct_from(incoming.c.volume)
+            )
+        )
+        .values(quote_price=incoming.c.price, volume=incoming.c.volume, quoted_at=datetime.utcnow())
+    )
+    return result.rowcount
+
+def prewarm_urls_in_background(symbols):
+    """Resolve CafeF URLs for the new universe without holding up the request."""
+    from services.get_stock_data import prewarm_stock_urls
+    app = current_app._get_current_object()
+
+    def run():
+        with app.app_context():
+            try:
+                prewarm_stock_urls(symbols)
+            except Exception as e:
+                print(f"Error pre-resolving stock URLs: {e}")
+                db.session.rollback()
+
+    threading.Thread(target=run, name='stock-url-prewarm', daemon=True).start()
 
 def pull_stock_list():
-    # Get the stock list
-    stocks_data = get_stock_list()
-    
-    error = False
-    if stocks_data:
-        message = f"Found {len(stocks_data)} stocks"
-        # Save to database
-        save_to_database(stocks_data)
-    else:   
-        message = "No stocks data to save"
-        error = True
-    return message, error
+    """Fetch the TradingView universe page by page, upserting each page as it lands.
+
+    Stocks missing from a complete refresh are marked delisted. Consumers
+    of the change log are notified with a 'stock_changes' event.
+    """
+    counts = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'changes': 0, 'market_caps': 0, 'quotes': 0}
+    symbols = []
+    fetch_error = None
+    try:
+        for page in iter_stock_pages():
+            page_counts = save_to_database(page)
+            if page_counts is None:
+                return "Error saving stocks to database", True
+            for key in counts:
+                counts[key] += page_counts[key]
+            symbols.extend(stock_info['symbol'] for stock_info in page)
+    except (requests.exceptions.RequestException, json.JSONDecodeError, PartialStockListError) as e:
+        print(f"Error fetching stock list: {e}")
+        fetch_error = e
+
+    if not symbols:
+        return "No stocks data to save", True
+
+    # A partial or capped fetch can't tell a delisting from a stock it didn't get to
+    delisted = []
+    if fetch_error is None:
+        try:
+            delisted = mark_delisted(set(symbols))
+            db.session.commit()
+        except Exception as e:
+            print(f"Error marking delisted stocks: {e}")
+            db.session.rollback()
+
+    if counts['changes'] or delisted:
+        suggestions.reload()
+        broker.publish('stock_changes', {
+            'changes': counts['changes'] + len(delisted),
+            'delisted': len(delisted)
+        })
+    prewarm_urls_in_background(symbols)
+    message = (
+        f"Found {len(symbols)} stocks ({counts['inserted']} new, {counts['updated']} updated, "
+        f"{counts['unchanged']} unchanged, {len(delisted)} delisted, {counts['market_caps']} market caps and "
+        f"{counts['quotes']} quotes updated)"
+    )
+    if fetch_error is not None:
+        message += f"; stopped early: {fetch_error}"
+    return message, False
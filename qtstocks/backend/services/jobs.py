@@ -0,0 +1,145 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import func
+from config import Config
+from extensions import db
+from models import ScrapeJob, User
+from services.events import broker
+
+# Pulls run here, outside of the request that submitted them
+_executor = ThreadPoolExecutor(max_workers=Config.JOB_WORKERS, thread_name_prefix='stats-job')
+
+# Jobs queued or running in this process, kept alive by the heartbeat thread
+_owned = set()
+_owned_lock = threading.Lock()
+_heartbeat_thread = None
+
+
+def _start_heartbeat(app):
+    """Bump heartbeat_at on this process's jobs every JOB_HEARTBEAT_SECONDS.
+
+    The executor only lives in memory, so when the process dies its jobs stop
+    being bumped and expire_stale_jobs fails them.
+    """
+    global _heartbeat_thread
+    with _owned_lock:
+        if _heartbeat_thread is not None:
+            return
+
+        def loop():
+            while True:
+                time.sleep(Config.JOB_HEARTBEAT_SECONDS)
+                with _owned_lock:
+                    job_ids = list(_owned)
+                if not job_ids:
+                    continue
+                with app.app_context():
+                    try:
+                        ScrapeJob.query.filter(ScrapeJob.id.in_(job_ids)).update(
+                            {ScrapeJob.heartbeat_at: datetime.utcnow()}, synchronize_session=False
+                        )
+                        db.session.commit()
+                    except Exception as e:
+                        print(f"Error updating job heartbeats: {str(e)}")
+                        db.session.rollback()
+                    finally:
+                        db.session.remove()
+
+        _heartbeat_thread = threading.Thread(target=loop, name='stats-job-heartbeat', daemon=True)
+        _heartbeat_thread.start()
+
+
+def submit_stats_job(current_user, symbols, load_latest_data=False):
+    """Queue a stock stats pull and return its ScrapeJob row."""
+    symbols = list(dict.fromkeys(symbols))
+    job = ScrapeJob(
+        id=str(uuid.uuid4()),
+        user_id=current_user.id,
+        status='queued',
+        symbols=symbols,
+        load_latest_data=load_latest_data,
+        total=len(symbols),
+        done=0,
+        failed=0,
+        heartbeat_at=datetime.utcnow()
+    )
+    db.session.add(job)
+    db.session.commit()
+
+    app = current_app._get_current_object()
+    _start_heartbeat(app)
+    with _owned_lock:
+        _owned.add(job.id)
+    _executor.submit(run_stats_job, app, job.id)
+    return job
+
+
+def expire_stale_jobs(user_id=None):
+    """Fail unfinished jobs whose process stopped heartbeating, e.g. after a restart or deploy."""
+    cutoff = datetime.utcnow() - timedelta(seconds=Config.JOB_STALE_SECONDS)
+    query = ScrapeJob.query.filter(
+        ScrapeJob.status.in_(('queued', 'running')),
+        func.coalesce(ScrapeJob.heartbeat_at, ScrapeJob.created_at) < cutoff
+    )
+    if user_id is not None:
+        query = query.filter(ScrapeJob.user_id == user_id)
+    jobs = query.all()
+    if not jobs:
+        return 0
+
+    now = datetime.utcnow()
+    for job in jobs:
+        job.status = 'failed'
+        job.error = 'The server running this pull stopped, please pull again'
+        job.finished_at = now
+    db.session.commit()
+    for job in jobs:
+        print(f"Stats job {job.id} stopped heartbeating, marked failed")
+        broker.publish('job', job.to_dict(), user_id=job.user_id)
+    return len(jobs)
+
+
+def run_stats_job(app, job_id):
+    """Execute a queued pull, recording progress on the job row as symbols finish."""
+    # Loads Selenium and the scraper on the first pull rather than at boot
+    from services.get_stock_data import pull_stock_stats
+    with app.app_context():
+        try:
+            job = db.session.get(ScrapeJob, job_id)
+            user = db.session.get(User, job.user_id)
+            job.status = 'running'
+            job.started_at = datetime.utcnow()
+            job.heartbeat_at = job.started_at
+            db.session.commit()
+            broker.publish('job', job.to_dict(), user_id=job.user_id)
+
+            def on_result(symbol, ok):
+                if ok:
+                    job.done += 1
+                else:
+                    job.failed += 1
+                db.session.commit()
+                broker.publish('job', dict(job.to_dict(), symbol=symbol, ok=ok), user_id=job.user_id)
+
+            try:
+                pull_stock_stats(job.symbols, user, job.load_latest_data, on_result=on_result)
+                job.status = 'completed'
+            except Exception as e:
+                print(f"Error in stats job {job_id}: {str(e)}")
+                db.session.rollback()
+                job.status = 'failed'
+                job.error = str(e)
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+            broker.publish('job', job.to_dict(), user_id=job.user_id)
+        except Exception as e:
+            print(f"Error running stats job {job_id}: {str(e)}")
+            db.session.rollback()
+        finally:
+            with _owned_lock:
+                _owned.discard(job_id)
+            db.session.remove()
@@ -0,0 +1,90 @@
+import re
+
+# Scraped metric key -> StockStats column
+METRIC_COLUMNS = {
+    'Price': 'price',
+    'MarketCap': 'market_cap',
+    'EPS': 'eps',
+    'P/E': 'pe',
+    'P/B': 'pb',
+}
+
+# Multipliers for unit words, relative to CafeF's "tỷ đồng" market cap unit.
+# Percentages stay on their 0-100 scale, as stored since before this parser
+UNIT_SCALE = {
+    'nghìn tỷ': 1e3,
+    'ngàn tỷ': 1e3,
+    'tỷ': 1.0,
+    'triệu': 1e-3,
+}
+
+# What CafeF shows for a metric it has no value for
+MISSING_PLACEHOLDERS = ('', '-', '--', 'n/a')
+
+# Compiled once; longer unit words first so "nghìn tỷ" wins over "tỷ"
+_WHITESPACE = re.compile(r'[\s\xa0]+')
+_UNIT = re.compile('|'.join(re.escape(unit) for unit in sorted(UNIT_SCALE, key=len, reverse=True)))
+_NUMBER = re.compile(r'[-+]?[\d.,]*\d')
+_COMMA_GROUPS = re.compile(r'[-+]?\d{1,3}(,\d{3})+')
+_DOT_GROUPS = re.compile(r'[-+]?\d{1,3}(\.\d{3}){2,}')
+
+
+def parse_number(value):
+    """Parse one scraped number string.
+
+    Handles both "1,234.5" and Vietnamese "1.234,5" separators, "tỷ"/"triệu"
+    unit words and percentages ("12,5%" is 12.5). A lone separator
+    followed by exactly three digits groups thousands when it is a comma
+    ("70,500") and is a decimal point when it is a dot ("70.500"), matching
+    what CafeF renders.
+
+    Returns ``(number, failed)``: the float or None, and whether a non-empty
+    input didn't parse.
+    """
+    text = _WHITESPACE.sub(' ', str(value or '').lower().replace('−', '-')).strip()
+    if text in MISSING_PLACEHOLDERS:
+        return None, False
+
+    match = _NUMBER.search(text)
+    if not match:
+        return None, True
+    number = match.group()
+
+    # Which character is the decimal separator; the other one groups thousands
+    if '.' in number and ',' in number:
+        decimal_comma = number.rfind(',') > number.rfind('.')
+    elif ',' in number:
+        decimal_comma = not _COMMA_GROUPS.fullmatch(number)
+    elif '.' in number:
+        decimal_comma = bool(_DOT_GROUPS.fullmatch(number))
+    else:
+        decimal_comma = False
+    if decimal_comma:
+        number = number.replace('.', '').replace(',', '.')
+    else:
+        number = number.replace(',', '')
+
+    try:
+        parsed = float(number)
+    except ValueError:
+        return None, True
+    unit = _UNIT.search(text)
+    return parsed * UNIT_SCALE[unit.group()] if unit else parsed, False
+
+
+def normalize_metrics(batch):
+    """Turn ``[(symbol, metrics), ...]`` into StockStats column values.
+
+    Returns ``(rows, failures)`` where rows are dicts keyed by symbol plus the
+    StockStats columns (None where a value is missing or unparsable) and
+    failures maps symbols to the columns that could not be parsed.
+    """
+    rows, failures = [], {}
+    for symbol, metrics in batch:
+        row = {'symbol': symbol}
+        for key, column in METRIC_COLUMNS.items():
+            row[column], failed = parse_number(metrics.get(key))
+            if failed:
+                failures.setdefault(symbol, []).append(column)
+        rows.append(row)
+    return rows, failures
@@ -0,0 +1,63 @@
+import os
+from prometheus_client import (
+    CollectorRegistry, Counter, Histogram, REGISTRY, CONTENT_TYPE_LATEST, generate_latest, multiprocess
+)
+
+# Stages, each observed at most once per scrape attempt:
+#   search, db_commit
+#   static HTML: http_fetch, http_extract
+#   browser: page_load, render_wait, page_source, extract
+SCRAPE_STAGE_SECONDS = Histogram(
+    'qtstocks_scrape_stage_seconds',
+    'Time spent in each stage of a stock stats scrape',
+    ['stage'],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 60)
+)
+
+# outcome: success, fallback (Selenium or the alt layout was needed), failure
+SCRAPE_RESULTS = Counter(
+    'qtstocks_scrape_results_total',
+    'Per-symbol scrape outcomes',
+    ['outcome', 'source', 'layout']
+)
+
+URL_CACHE_LOOKUPS = Counter(
+    'qtstocks_url_cache_lookups_total',
+    'CafeF URL cache lookups by result',
+    ['result']
+)
+
+WEBDRIVER_EVENTS = Counter(
+    'qtstocks_webdriver_events_total',
+    'WebDriver lifecycle events: started, start_failed, recycled, crashed',
+    ['event']
+)
+
+METRIC_PARSE_FAILURES = Counter(
+    'qtstocks_metric_parse_failures_total',
+    'Scraped metric values that could not be parsed as numbers',
+    ['column']
+)
+
+STATS_ROWS_WRITTEN = Counter(
+    'qtstocks_stats_rows_written_total',
+    'StockStats rows written by scrapes'
+)
+
+
+def stage_timer(stage):
+    """Context manager that records the duration of a scrape stage."""
+    return SCRAPE_STAGE_SECONDS.labels(stage).time()
+
+
+def metrics_response():
+    """Render every metric in the Prometheus text format.
+
+    Under gunicorn set PROMETHEUS_MULTIPROC_DIR so all workers are aggregated.
+    """
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), 200, {'Content-Type': CONTENT_TYPE_LATEST}
@@ -0,0 +1,124 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse
+
+
+class HostRateLimiter:
+    """Spaces out requests so each host sees at most ``requests_per_second``."""
+
+    def __init__(self, requests_per_second):
+        self._interval = 1.0 / requests_per_second if requests_per_second > 0 else 0.0
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url):
+        """Block until a request to the host of ``url`` is allowed."""
+        if not self._interval:
+            return
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self._interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+class CircuitBreaker:
+    """Stops calling a failing dependency for a while after repeated failures.
+
+    After ``failure_threshold`` consecutive failures the breaker opens and
+    ``allow`` returns False for ``reset_timeout`` seconds. Then one trial
+    call is let through: success closes the breaker, failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold=3, reset_timeout=60):
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        with self._lock:
+            return self._opened_at is not None
+
+    def allow(self):
+        """Whether a call may go ahead right now."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._trial_running or time.monotonic() - self._opened_at < self._reset_timeout:
+                return False
+            self._trial_running = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_running = False
+            if self._opened_at is not None or self._failures >= self._failure_threshold:
+                self._opened_at = time.monotonic()
+
+
+class InflightRegistry:
+    """Tracks symbols being scraped so concurrent pulls share a single scrape.
+
+    Only covers pulls in this process; services.scrape_locks extends it to
+    other processes with Postgres advisory locks.
+    """
+
+    def __init__(self):
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def claim(self, symbols):
+        """Split ``symbols`` into ones the caller must scrape and ones already in flight.
+
+        Returns ``(owned, waiting)`` where ``waiting`` maps symbols to futures
+        resolved with True/False by whoever owns them. Every owned symbol must
+        be passed to ``resolve`` exactly once.
+        """
+        owned, waiting = [], {}
+        with self._lock:
+            for symbol in symbols:
+                if symbol in self._inflight:
+                    waiting[symbol] = self._inflight[symbol]
+                else:
+                    self._inflight[symbol] = Future()
+                    owned.append(symbol)
+        return owned, waiting
+
+    def resolve(self, symbol, ok):
+        """Release an owned symbol and wake up pulls waiting on it."""
+        with self._lock:
+            future = self._inflight.pop(symbol, None)
+        if future is not None:
+            future.set_result(ok)
+
+
+def scrape_concurrently(symbols, scrape, workers):
+    """Run ``scrape(symbol)`` on a thread pool.
+
+    Yields ``(symbol, result, error)`` tuples in completion order so the
+    caller can merge results on its own thread. Only one of ``result`` and
+    ``error`` is set.
+    """
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='scraper') as executor:
+        futures = {executor.submit(scrape, symbol): symbol for symbol in symbols}
+        for future in as_completed(futures):
+            symbol = futures[future]
+            try:
+                yield symbol, future.result(), None
+            except Exception as e:
+                yield symbol, None, e
@@ -0,0 +1,73 @@
+import time
+from contextlib import contextmanager
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import array
+from extensions import db
+
+# pg advisory lock namespace for symbols being scraped; the second key is hashtext(symbol)
+SCRAPE_LOCK_NAMESPACE = 724002
+
+# Seconds between checks while another process holds a symbol
+SCRAPE_LOCK_POLL_SECONDS = 1.0
+
+
+def _try_lock(conn, symbols):
+    """Take the scrape lock for every free symbol in one query and return those taken."""
+    symbol = func.unnest(array(symbols)).column_valued('symbol')
+    locked = conn.execute(
+        select(symbol).where(func.pg_try_advisory_lock(SCRAPE_LOCK_NAMESPACE, func.hashtext(symbol)))
+    ).scalars().all()
+    conn.commit()
+    return locked
+
+
+@contextmanager
+def symbol_locks(symbols):
+    """Claim ``symbols`` for scraping across processes.
+
+    InflightRegistry only coalesces pulls within one process; these locks
+    cover pulls in other gunicorn workers and the snapshot. Yields
+    ``(locked, busy)``: symbols the caller now holds and symbols another
+    process is scraping. They are session-level locks on a dedicated
+    connection, held until the block exits, since a pull commits once per
+    symbol. Without Postgres every symbol is yielded as locked.
+    """
+    symbols = list(symbols)
+    if not symbols or db.engine.dialect.name != 'postgresql':
+        yield symbols, []
+        return
+    with db.engine.connect() as conn:
+        try:
+            locked = set(_try_lock(conn, symbols))
+            yield [s for s in symbols if s in locked], [s for s in symbols if s not in locked]
+        finally:
+            # Pooled connections outlive this block, so the locks must be released explicitly
+            conn.execute(select(func.pg_advisory_unlock_all()))
+            conn.commit()
+
+
+def wait_for_symbols(symbols, timeout):
+    """Wait for other processes to finish scraping ``symbols``.
+
+    Returns the symbols released within ``timeout`` seconds.
+    """
+    pending = list(symbols)
+    if not pending or db.engine.dialect.name != 'postgresql':
+        return set(pending)
+    released = set()
+    deadline = time.monotonic() + timeout
+    with db.engine.connect() as conn:
+        try:
+            while True:
+                # Taking a lock proves its holder is done; it is given straight back
+                released.update(_try_lock(conn, pending))
+                conn.execute(select(func.pg_advisory_unlock_all()))
+                conn.commit()
+                pending = [symbol for symbol in pending if symbol not in released]
+                if not pending or time.monotonic() >= deadline:
+                    break
+                time.sleep(SCRAPE_LOCK_POLL_SECONDS)
+        finally:
+            conn.execute(select(func.pg_advisory_unlock_all()))
+            conn.commit()
+    return released
@@ -0,0 +1,18 @@
+class ScraperError(Exception):
+    """Base class for failures of the scraping subsystem."""
+
+
+class DriverStartError(ScraperError):
+    """Chrome could not be started after retrying."""
+
+
+class ScraperUnavailableError(ScraperError):
+    """The browser circuit breaker is open, so no browser will be started."""
+
+
+class StockPageGoneError(ScraperError):
+    """The stock page answered 404/410 or redirected elsewhere, so its cached URL is stale."""
+
+
+class NoMetricsError(ScraperError):
+    """The page loaded but neither known layout had any metric values."""
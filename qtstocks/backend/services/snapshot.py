@@ -0,0 +1,133 @@
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import func, select
+from config import Config
+from extensions import db
+from models import Stock, StockStats
+from services.events import broker
+from services.freshness import is_stale
+from services.get_stock_data import scraper
+from services.scrape_engine import scrape_concurrently
+from services.scrape_locks import symbol_locks
+from services.scraper_errors import StockPageGoneError
+from services.stats_store import upsert_stock_stats
+from services.stats_history import compact_history
+from services.stock_changes import prune_changes
+from services.stock_urls import invalidate_stock_urls
+
+# pg advisory lock key so only one process runs a snapshot at a time
+SNAPSHOT_LOCK_KEY = 724001
+
+# Days before the history cutoff each run re-checks, covering runs that were missed
+COMPACT_WINDOW_DAYS = 7
+
+
+def snapshot_all_stats(chunk_size=None):
+    """Refresh stale StockStats for the whole Stock universe.
+
+    Results are buffered and written with one upsert per ``chunk_size``
+    rows instead of a commit per symbol. Returns a summary dict.
+    """
+    chunk_size = chunk_size or Config.SNAPSHOT_CHUNK_SIZE
+    started = time.monotonic()
+    now = datetime.utcnow()
+
+    last_updated = dict(db.session.query(StockStats.symbol, StockStats.last_updated).all())
+    candidates = [
+        (symbol, exchange) for symbol, exchange in
+        db.session.query(Stock.symbol, Stock.exchange)
+        .filter(Stock.delisted_at.is_(None))
+        .order_by(Stock.symbol)
+        .all()
+    ]
+    stale = [symbol for symbol, exchange in candidates if is_stale(last_updated.get(symbol), exchange, now)]
+    print(f"Snapshot: {len(stale)} of {len(candidates)} stocks need refreshing")
+
+    owned, _ = scraper.inflight.claim(stale)
+    summary = {'total': len(candidates), 'stale': len(stale), 'busy': 0, 'written': 0, 'failed': 0}
+    try:
+        # Symbols a pull in another process is scraping are left to it
+        with symbol_locks(owned) as (locked, busy):
+            summary['busy'] = len(busy)
+            urls = scraper.resolve_urls(locked)
+            to_scrape = [symbol for symbol in locked if urls.get(symbol)]
+            summary['failed'] += len(locked) - len(to_scrape)
+
+            buffer = []
+            gone = []
+
+            def flush():
+                if not buffer:
+                    return
+                # Numbers for the whole chunk are parsed before a single upsert
+                rows = scraper.metrics_to_rows(buffer)
+                summary['written'] += upsert_stock_stats(rows, chunk_size=chunk_size)
+                symbols = [row['symbol'] for row in rows]
+                for symbol in symbols:
+                    scraper.inflight.resolve(symbol, True)
+                broker.publish('snapshot', {'symbols': symbols})
+                buffer.clear()
+
+            results = scrape_concurrently(
+                to_scrape,
+                lambda symbol: scraper.scrape_symbol(symbol, urls[symbol]),
+                Config.SCRAPER_WORKERS
+            )
+            for symbol, metrics, error in results:
+                if error:
+                    print(f"Snapshot: error scraping {symbol}: {str(error)}")
+                    summary['failed'] += 1
+                    if isinstance(error, StockPageGoneError):
+                        gone.append(symbol)
+                    scraper.inflight.resolve(symbol, False)
+                    continue
+                buffer.append((symbol, metrics))
+                if len(buffer) >= chunk_size:
+                    flush()
+            flush()
+            invalidate_stock_urls(gone)
+    except Exception:
+        db.session.rollback()
+        raise
+    finally:
+        for symbol in owned:
+            scraper.inflight.resolve(symbol, False)
+
+    summary['seconds'] = round(time.monotonic() - started, 1)
+    print(f"Snapshot finished: {summary}")
+    return summary
+
+
+def run_snapshot_exclusively():
+    """Run a snapshot unless another process already holds the snapshot lock."""
+    with db.engine.connect() as conn:
+        if not conn.execute(select(func.pg_try_advisory_lock(SNAPSHOT_LOCK_KEY))).scalar():
+            print("Snapshot already running elsewhere, skipping")
+            return None
+        try:
+            summary = snapshot_all_stats()
+            summary['history_compacted'] = compact_history(window_days=COMPACT_WINDOW_DAYS)
+            summary['changes_pruned'] = prune_changes()
+            return summary
+        finally:
+            conn.execute(select(func.pg_advisory_unlock(SNAPSHOT_LOCK_KEY)))
+
+
+def start_snapshot_scheduler(app):
+    """Run a snapshot every STATS_SNAPSHOT_INTERVAL_MINUTES on a daemon thread."""
+    interval = Config.STATS_SNAPSHOT_INTERVAL_MINUTES * 60
+
+    def loop():
+        while True:
+            time.sleep(interval)
+            with app.app_context():
+                try:
+                    run_snapshot_exclusively()
+                except Exception as e:
+                    print(f"Error in stats snapshot: {str(e)}")
+                    db.session.rollback()
+                finally:
+                    db.session.remove()
+
+    threading.Thread(target=loop, name='stats-snapshot', daemon=True).start()
@@ -0,0 +1,108 @@
+from datetime import datetime, timedelta
+from sqlalchemy import func, literal_column
+from sqlalchemy.dialects.postgresql import insert, array_agg, aggregate_order_by
+from sqlalchemy.orm import aliased
+from config import Config
+from extensions import db
+from models import StockStatsHistory
+
+# Metrics copied into the history on every StockStats write
+HISTORY_COLUMNS = ('price', 'market_cap', 'eps', 'pe', 'pb')
+
+# 'raw' returns every snapshot, the others are date_trunc buckets
+INTERVALS = ('raw', 'day', 'week')
+
+# Upper bound on points returned for one query
+MAX_POINTS = 5000
+
+
+def record_history(rows):
+    """Append StockStats rows to the history in the current transaction.
+
+    ``rows`` are dicts keyed by symbol, HISTORY_COLUMNS and last_updated, as
+    written to StockStats. The caller commits.
+    """
+    values = [
+        dict({column: row.get(column) for column in HISTORY_COLUMNS},
+             symbol=row['symbol'], captured_at=row['last_updated'])
+        for row in rows if row.get('last_updated')
+    ]
+    if values:
+        db.session.execute(insert(StockStatsHistory).values(values).on_conflict_do_nothing())
+
+
+def compact_history(raw_days=None, window_days=None):
+    """Keep only the last snapshot per symbol and day for days older than ``raw_days``.
+
+    ``raw_days`` defaults to STATS_HISTORY_RAW_DAYS; 0 disables compaction.
+    With ``window_days`` only that many days before the cutoff are scanned,
+    which is all a regular run needs. Daily and weekly rollups of compacted
+    days still report the closing values. Commits and returns the number of
+    rows deleted.
+    """
+    raw_days = Config.STATS_HISTORY_RAW_DAYS if raw_days is None else raw_days
+    if raw_days <= 0:
+        return 0
+    # Whole days only, so a day is never compacted while it still gets snapshots
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    cutoff = today - timedelta(days=raw_days)
+
+    later = aliased(StockStatsHistory)
+    captured_at = StockStatsHistory.captured_at
+    superseded = db.session.query(later.symbol).filter(
+        later.symbol == StockStatsHistory.symbol,
+        later.captured_at > captured_at,
+        later.captured_at < func.date_trunc('day', captured_at) + timedelta(days=1)
+    ).exists()
+    query = StockStatsHistory.query.filter(captured_at < cutoff, superseded)
+    if window_days:
+        query = query.filter(captured_at >= cutoff - timedelta(days=window_days))
+    deleted = query.delete(synchronize_session=False)
+    db.session.commit()
+    print(f"Compacted stats history before {cutoff:%Y-%m-%d}: {deleted} rows removed")
+    return deleted
+
+
+def query_history(symbol, start, end, interval='raw'):
+    """Return history points for ``symbol`` between ``start`` and ``end``, oldest first.
+
+    Daily and weekly rollups carry the last value of each metric in the
+    bucket, the price range and the number of snapshots behind it.
+    """
+    captured_at = StockStatsHistory.captured_at
+    in_range = (StockStatsHistory.symbol == symbol, captured_at >= start, captured_at < end)
+
+    if interval == 'raw':
+        rows = StockStatsHistory.query.filter(*in_range).order_by(captured_at).limit(MAX_POINTS).all()
+        return [
+            dict({column: getattr(row, column) for column in HISTORY_COLUMNS}, time=row.captured_at)
+            for row in rows
+        ]
+
+    if interval not in INTERVALS:
+        raise ValueError(f"Unknown interval {interval}")
+    # Inline the unit so SELECT and GROUP BY are the same expression to Postgres
+    bucket = func.date_trunc(literal_column(f"'{interval}'"), captured_at).label('bucket')
+    last_values = [
+        array_agg(aggregate_order_by(getattr(StockStatsHistory, column), captured_at.desc()))[1].label(column)
+        for column in HISTORY_COLUMNS
+    ]
+    first_price = array_agg(aggregate_order_by(StockStatsHistory.price, captured_at))[1].label('price_open')
+    rows = db.session.query(
+        bucket,
+        *last_values,
+        first_price,
+        func.max(StockStatsHistory.price).label('price_high'),
+        func.min(StockStatsHistory.price).label('price_low'),
+        func.count().label('samples')
+    ).filter(*in_range).group_by(bucket).order_by(bucket).limit(MAX_POINTS).all()
+    return [
+        {
+            'time': row.bucket,
+            **{column: getattr(row, column) for column in HISTORY_COLUMNS},
+            'price_open': row.price_open,
+            'price_high': row.price_high,
+            'price_low': row.price_low,
+            'samples': row.samples
+        } for row in rows
+    ]
@@ -0,0 +1,32 @@
+from sqlalchemy.dialects.postgresql import insert
+from extensions import db
+from models import StockStats
+from services.metrics import stage_timer, STATS_ROWS_WRITTEN
+from services.stats_history import record_history
+
+# Columns written by scrapes, everything except the primary key
+STATS_COLUMNS = ('price', 'market_cap', 'eps', 'pe', 'pb', 'last_updated')
+
+
+def upsert_stock_stats(rows, chunk_size=500):
+    """Write StockStats rows with INSERT ... ON CONFLICT DO UPDATE.
+
+    ``rows`` are dicts keyed by symbol plus STATS_COLUMNS. Each chunk is
+    one statement and one transaction, which also appends the rows to
+    StockStatsHistory.
+    """
+    written = 0
+    for i in range(0, len(rows), chunk_size):
+        chunk = rows[i:i + chunk_size]
+        stmt = insert(StockStats).values(chunk)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[StockStats.symbol],
+            set_={column: stmt.excluded[column] for column in STATS_COLUMNS}
+        )
+        with stage_timer('db_commit'):
+            db.session.execute(stmt)
+            record_history(chunk)
+            db.session.commit()
+        STATS_ROWS_WRITTEN.inc(len(chunk))
+        written += len(chunk)
+    return written
@@ -0,0 +1,147 @@
+import hashlib
+import json
+from datetime import datetime, timedelta
+from sqlalchemy import cast, update, values, column as sql_column, String, Float
+from config import Config
+from extensions import db
+from models import Stock, StockChange
+
+# Stock columns refreshed from TradingView, and so part of the content hash.
+# market_cap moves with the price on nearly every pull, so it is kept out of
+# the hash and only rewritten past MARKET_CAP_CHANGE_RATIO, see update_market_caps
+STOCK_COLUMNS = ('name', 'icon', 'exchange', 'sector')
+
+
+def content_hash(stock_info):
+    """md5 of the refreshed columns, stored on Stock to spot unchanged rows."""
+    payload = json.dumps([stock_info.get(column) for column in STOCK_COLUMNS], ensure_ascii=False, default=str)
+    return hashlib.md5(payload.encode('utf-8')).hexdigest()
+
+
+def market_cap_moved(old, new):
+    """Whether a market cap moved more than MARKET_CAP_CHANGE_RATIO of its stored value."""
+    if new is None:
+        # A missing value is a gap in the feed, keep what is stored
+        return False
+    if old is None:
+        return True
+    return abs(new - old) > Config.MARKET_CAP_CHANGE_RATIO * abs(old)
+
+
+def diff_stocks(rows):
+    """Compare incoming TradingView rows with what is stored.
+
+    One query reads the stored hashes for every symbol in ``rows``. Returns
+    ``(changed, changes, unchanged, market_caps)``: rows that need upserting
+    (each with its ``content_hash`` set), StockChange entries describing
+    them, the number of rows that can be skipped and ``(symbol, old, new)``
+    market caps for update_market_caps. The caller keeps only the changes of
+    rows the upsert actually wrote.
+    """
+    stored = {
+        stock.symbol: stock for stock in
+        db.session.query(
+            Stock.symbol, Stock.content_hash, Stock.exchange, Stock.market_cap, Stock.delisted_at
+        ).filter(Stock.symbol.in_([row['symbol'] for row in rows])).all()
+    }
+    changed, changes, unchanged, market_caps = [], [], 0, []
+    for row in rows:
+        row = dict(row, content_hash=content_hash(row))
+        old = stored.get(row['symbol'])
+        # The insert sets market_cap on new rows, stored rows only get it from update_market_caps
+        if old is not None and market_cap_moved(old.market_cap, row.get('market_cap')):
+            market_caps.append((row['symbol'], old.market_cap, row['market_cap']))
+        if old is None or old.delisted_at is not None:
+            changes.append(StockChange(
+                symbol=row['symbol'], change_type='listed',
+                new_value={column: row.get(column) for column in STOCK_COLUMNS + ('market_cap',)}
+            ))
+        elif old.content_hash == row['content_hash']:
+            unchanged += 1
+            continue
+        elif old.content_hash is None:
+            # Rows hashed before (or with an older column set) are backfilled without logging
+            pass
+        elif old.exchange != row['exchange']:
+            changes.append(StockChange(
+                symbol=row['symbol'], change_type='exchange_moved',
+                old_value=old.exchange, new_value=row['exchange']
+            ))
+        else:
+            changes.append(StockChange(
+                symbol=row['symbol'], change_type='updated',
+                new_value={column: row.get(column) for column in STOCK_COLUMNS}
+            ))
+        changed.append(row)
+    return changed, changes, unchanged, market_caps
+
+
+def update_market_caps(market_caps):
+    """Write market caps from diff_stocks and log a market_cap_changed entry for each.
+
+    A row is only updated while it still holds the value diff_stocks read,
+    and only updated rows are logged. The caller commits. Returns the number
+    of rows updated.
+    """
+    if not market_caps:
+        return 0
+    incoming = values(
+        sql_column('symbol', String), sql_column('old', Float), sql_column('new', Float),
+        name='incoming'
+    ).data(market_caps)
+    updated = set(db.session.execute(
+        update(Stock)
+        .where(
+            Stock.symbol == incoming.c.symbol,
+            # A VALUES column of only NULLs would otherwise be typed as text
+            Stock.market_cap.is_not_distinct_from(cast(incoming.c.old, Float))
+        )
+        .values(market_cap=incoming.c.new)
+        .returning(Stock.symbol)
+    ).scalars())
+    db.session.add_all([
+        StockChange(symbol=symbol, change_type='market_cap_changed', old_value=old, new_value=new)
+        for symbol, old, new in market_caps if symbol in updated
+    ])
+    return len(updated)
+
+
+def mark_delisted(seen_symbols):
+    """Flag listed stocks a complete refresh didn't return and log them. The caller commits."""
+    missing = [
+        symbol for (symbol,) in
+        db.session.query(Stock.symbol).filter(Stock.delisted_at.is_(None)).all()
+        if symbol not in seen_symbols
+    ]
+    if not missing:
+        return []
+    Stock.query.filter(Stock.symbol.in_(missing)).update(
+        {Stock.delisted_at: datetime.now()}, synchronize_session=False
+    )
+    db.session.add_all([StockChange(symbol=symbol, change_type='delisted') for symbol in missing])
+    return missing
+
+
+def changes_since(last_id=0, limit=500):
+    """Change log entries after ``last_id``, oldest first, for incremental consumers."""
+    return StockChange.query.filter(StockChange.id > last_id)\
+        .order_by(StockChange.id)\
+        .limit(limit)\
+        .all()
+
+
+def prune_changes(retention_days=None):
+    """Delete change log entries older than ``retention_days``.
+
+    ``retention_days`` defaults to STOCK_CHANGES_RETENTION_DAYS; 0 keeps
+    everything. changes_since consumers must catch up within that window.
+    Commits and returns the number of entries deleted.
+    """
+    retention_days = Config.STOCK_CHANGES_RETENTION_DAYS if retention_days is None else retention_days
+    if retention_days <= 0:
+        return 0
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    deleted = StockChange.query.filter(StockChange.created_at < cutoff).delete(synchronize_session=False)
+    db.session.commit()
+    print(f"Pruned stock change log before {cutoff:%Y-%m-%d}: {deleted} entries removed")
+    return deleted
@@ -0,0 +1,47 @@
+from sqlalchemy import Float, case, cast, func, or_
+from models import Stock
+
+# Same expressions as the trigram indexes from migration 012, so Postgres can use them
+SYMBOL_KEY = func.lower(Stock.symbol)
+NAME_KEY = func.lower(func.f_unaccent(Stock.name))
+
+# Shorter terms have too few trigrams for fuzzy matching to mean anything
+MIN_FUZZY_LENGTH = 3
+
+
+def escape_like(term):
+    """Escape LIKE wildcards so user input matches literally."""
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def search_stocks(query, search):
+    """Filter ``query`` to stocks matching ``search`` and return ``(query, order_by)``.
+
+    Matches are substring matches on the symbol or the accent-folded name,
+    plus trigram-similar names for typos. ``order_by`` ranks exact symbol
+    hits first, then symbol prefixes, name prefixes, and the rest by
+    similarity.
+    """
+    term = func.lower(func.f_unaccent(search))
+    pattern = escape_like(search.lower())
+    contains = '%' + pattern + '%'
+
+    matches = [
+        SYMBOL_KEY.like(contains, escape='\\'),
+        NAME_KEY.like(func.concat('%', func.lower(func.f_unaccent(pattern)), '%'), escape='\\'),
+    ]
+    if len(search) >= MIN_FUZZY_LENGTH:
+        # pg_trgm's % operator, true above pg_trgm.similarity_threshold (0.3 by default)
+        matches.append(NAME_KEY.op('%')(term))
+    query = query.filter(or_(*matches))
+
+    rank = case(
+        (SYMBOL_KEY == search.lower(), 0),
+        (SYMBOL_KEY.like(pattern + '%', escape='\\'), 1),
+        (NAME_KEY.like(func.concat(func.lower(func.f_unaccent(pattern)), '%'), escape='\\'), 2),
+        else_=3
+    )
+    # similarity() is a real; as double precision it survives a round trip
+    # through a keyset cursor and still compares equal
+    similarity = cast(func.similarity(NAME_KEY, term), Float)
+    return query, [rank, similarity.desc()]
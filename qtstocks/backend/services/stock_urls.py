@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta
+from sqlalchemy.dialects.postgresql import insert
+from config import Config
+from extensions import db
+from models import StockUrlCache
+from services.scrape_engine import scrape_concurrently
+from services.metrics import URL_CACHE_LOOKUPS
+
+
+def _is_fresh(entry, now):
+    """Whether a cached lookup is still within its TTL."""
+    if entry.url:
+        ttl = timedelta(days=Config.STOCK_URL_CACHE_TTL_DAYS)
+    else:
+        ttl = timedelta(hours=Config.STOCK_URL_NEGATIVE_TTL_HOURS)
+    return entry.resolved_at is not None and entry.resolved_at > now - ttl
+
+
+def save_stock_urls(resolved):
+    """Upsert ``{symbol: url or None}`` into the cache and commit."""
+    if not resolved:
+        return
+    now = datetime.utcnow()
+    stmt = insert(StockUrlCache).values([
+        {'symbol': symbol, 'url': url, 'resolved_at': now}
+        for symbol, url in resolved.items()
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[StockUrlCache.symbol],
+        set_={'url': stmt.excluded.url, 'resolved_at': stmt.excluded.resolved_at}
+    )
+    db.session.execute(stmt)
+    db.session.commit()
+
+
+def invalidate_stock_urls(symbols):
+    """Drop cached lookups so the next scrape searches again."""
+    if not symbols:
+        return
+    StockUrlCache.query.filter(StockUrlCache.symbol.in_(symbols)).delete(synchronize_session=False)
+    db.session.commit()
+
+
+def resolve_stock_urls(symbols, search, workers, refresh=False, chunk_size=100):
+    """Return ``{symbol: url or None}`` for ``symbols``.
+
+    Only symbols without a fresh cache entry are passed to ``search``, which
+    runs on ``workers`` threads. Failed searches are not cached so they are
+    retried on the next call.
+    """
+    now = datetime.utcnow()
+    urls = {}
+    if not refresh:
+        for entry in StockUrlCache.query.filter(StockUrlCache.symbol.in_(symbols)).all():
+            if _is_fresh(entry, now):
+                urls[entry.symbol] = entry.url
+
+    misses = [symbol for symbol in dict.fromkeys(symbols) if symbol not in urls]
+    URL_CACHE_LOOKUPS.labels('hit').inc(len(urls))
+    URL_CACHE_LOOKUPS.labels('miss').inc(len(misses))
+    if misses:
+        print(f"Resolving CafeF URLs for {len(misses)} symbols")
+
+    resolved = {}
+    for symbol, url, error in scrape_concurrently(misses, search, workers):
+        if error:
+            print(f"Error finding stock URL for {symbol}: {str(error)}")
+            continue
+        urls[symbol] = url
+        resolved[symbol] = url
+        if len(resolved) >= chunk_size:
+            save_stock_urls(resolved)
+            resolved = {}
+    save_stock_urls(resolved)
+    return urls
@@ -0,0 +1,23 @@
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+# Config refuses to load without it; point it at a scratch database to test against one
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+
+@pytest.fixture
+def app():
+    """cli-profile app with the schema created from the models."""
+    from app import create_app
+    from extensions import db
+
+    app = create_app(profile='cli')
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
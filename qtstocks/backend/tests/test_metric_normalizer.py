@@ -0,0 +1,21 @@
+from services.metric_normalizer import normalize_metrics, parse_number
+
+
+def test_parse_number_separators_and_units():
+    assert parse_number('70,500') == (70500.0, False)
+    assert parse_number('1.234,5') == (1234.5, False)
+    assert parse_number('1,2 nghìn tỷ') == (1200.0, False)
+    assert parse_number('-') == (None, False)
+    assert parse_number('abc') == (None, True)
+
+
+def test_parse_number_keeps_percentages_on_their_scale():
+    assert parse_number('12,5%') == (12.5, False)
+    assert parse_number('-3.2 %') == (-3.2, False)
+
+
+def test_normalize_metrics_reports_unparsable_columns():
+    rows, failures = normalize_metrics([('VNM', {'Price': '70,500', 'EPS': 'abc'})])
+
+    assert rows == [{'symbol': 'VNM', 'price': 70500.0, 'market_cap': None, 'eps': None, 'pe': None, 'pb': None}]
+    assert failures == {'VNM': ['eps']}
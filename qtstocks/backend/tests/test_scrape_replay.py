@@ -0,0 +1,19 @@
+from benchmarks.scrape_replay import BENCH_USER_EMAIL, _prepare_database
+from models import Stock, User
+
+
+def test_prepare_database_creates_fixture_stocks_and_user(app):
+    user = _prepare_database(['VNM', 'FPT'])
+
+    assert user.email == BENCH_USER_EMAIL
+    assert user.is_active
+    assert {stock.symbol for stock in Stock.query.all()} == {'VNM', 'FPT'}
+
+
+def test_prepare_database_is_idempotent(app):
+    first = _prepare_database(['VNM'])
+    second = _prepare_database(['VNM', 'HPG'])
+
+    assert first.id == second.id
+    assert User.query.filter_by(email=BENCH_USER_EMAIL).count() == 1
+    assert Stock.query.count() == 2
@@ -0,0 +1,42 @@
+from datetime import datetime, timedelta
+
+from extensions import db
+from models import Stock, StockChange
+from services.stock_changes import content_hash, diff_stocks, prune_changes
+
+
+def _row(symbol, **values):
+    row = {'symbol': symbol, 'name': symbol, 'icon': None, 'exchange': 'HOSE', 'market_cap': 100.0, 'sector': 'Finance'}
+    row.update(values)
+    return row
+
+
+def _store(row):
+    db.session.add(Stock(
+        symbol=row['symbol'], name=row['name'], exchange=row['exchange'], market_cap=row['market_cap'],
+        sector=row['sector'], content_hash=content_hash(row)
+    ))
+    db.session.commit()
+
+
+def test_market_cap_moves_stay_out_of_the_hash(app):
+    _store(_row('VNM'))
+
+    changed, changes, unchanged, market_caps = diff_stocks([_row('VNM', market_cap=101.0)])
+    assert (changed, changes, unchanged, market_caps) == ([], [], 1, [])
+
+    changed, changes, unchanged, market_caps = diff_stocks([_row('VNM', market_cap=150.0)])
+    assert (changed, changes, unchanged) == ([], [], 1)
+    assert market_caps == [('VNM', 100.0, 150.0)]
+
+
+def test_prune_changes_keeps_recent_entries(app):
+    db.session.add_all([
+        StockChange(symbol='VNM', change_type='listed', created_at=datetime.utcnow() - timedelta(days=100)),
+        StockChange(symbol='FPT', change_type='listed', created_at=datetime.utcnow())
+    ])
+    db.session.commit()
+
+    assert prune_changes(retention_days=90) == 1
+    assert [change.symbol for change in StockChange.query.all()] == ['FPT']
+    assert prune_changes(retention_days=0) == 0
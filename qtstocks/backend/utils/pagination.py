@@ -0,0 +1,108 @@
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import and_, or_
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import UnaryExpression
+from extensions import db
+
+# Values of the total= argument in cursor mode; anything else leaves total out
+TOTAL_MODES = ('approx', 'exact')
+
+
+def sort_keys(order_by):
+    """Split ORDER BY clauses into ``(expression, descending)`` pairs."""
+    keys = []
+    for clause in order_by:
+        if isinstance(clause, UnaryExpression) and clause.modifier in (operators.desc_op, operators.asc_op):
+            keys.append((clause.element, clause.modifier is operators.desc_op))
+        else:
+            keys.append((clause, False))
+    return keys
+
+
+def encode_cursor(values):
+    """Opaque after= token for the sort key values of the last row on a page."""
+    values = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    payload = json.dumps(values, separators=(',', ':'), ensure_ascii=False)
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, keys):
+    """Sort key values from an after= token, raising ValueError if it doesn't fit ``keys``."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        if not isinstance(values, list) or len(values) != len(keys):
+            raise ValueError
+        return [
+            datetime.fromisoformat(value) if isinstance(expr.type, db.DateTime) else value
+            for (expr, _), value in zip(keys, values)
+        ]
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor, pass next_cursor from the previous page')
+
+
+def _after(keys, values):
+    """WHERE clause for rows sorting after ``values``.
+
+    Spelled as (k1 > v1) OR (k1 = v1 AND k2 > v2) ... since the keys can mix
+    directions, plus a plain bound on the leading key so its index can be
+    range-scanned. Key expressions must not be NULL.
+    """
+    steps = []
+    for i, ((expr, descending), value) in enumerate(zip(keys, values)):
+        ties = [key == tie for (key, _), tie in zip(keys[:i], values[:i])]
+        steps.append(and_(*ties, expr < value if descending else expr > value))
+    lead, descending = keys[0]
+    return and_(lead <= values[0] if descending else lead >= values[0], or_(*steps))
+
+
+def estimate_count(query):
+    """Row estimate from the Postgres planner; exact count on other databases."""
+    query = query.order_by(None)
+    bind = db.session.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return query.count()
+    compiled = query.statement.compile(dialect=bind.dialect, compile_kwargs={'render_postcompile': True})
+    plan = db.session.connection().exec_driver_sql(
+        'EXPLAIN (FORMAT JSON) ' + str(compiled), compiled.params
+    ).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def cursor_paginate(query, order_by, after=None, per_page=10, total=None):
+    """Keyset pagination: fetch the page after the ``after`` token.
+
+    ``order_by`` must end in a unique key so every row has a distinct
+    position. Each page is one indexed range query however deep it is,
+    instead of OFFSET plus COUNT(*). ``total`` is 'approx' for a planner
+    estimate, 'exact' for COUNT(*), or None to skip counting.
+    """
+    keys = sort_keys(order_by)
+    per_page = max(per_page, 1)
+    page_query = query.order_by(None)
+    if after:
+        page_query = page_query.filter(_after(keys, decode_cursor(after, keys)))
+    rows = page_query.add_columns(*[expr for expr, _ in keys])\
+        .order_by(*order_by)\
+        .limit(per_page + 1)\
+        .all()
+
+    has_next = len(rows) > per_page
+    rows = rows[:per_page]
+    if total == 'approx':
+        total = estimate_count(query)
+    elif total == 'exact':
+        total = query.order_by(None).count()
+    else:
+        total = None
+
+    return {
+        'items': [row[0] for row in rows],
+        'total': total,
+        'has_next': has_next,
+        'has_prev': bool(after),
+        'next_cursor': encode_cursor(tuple(rows[-1])[1:]) if has_next else None
+    }
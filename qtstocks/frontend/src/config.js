@@ -24,6 +24,8 @@ const API_STOCK_ENDPOINTS = {
     exportCsv: `${API_BASE_URL}/stocks/export`,
     exportGraphPdf: `${API_BASE_URL}/stocks/export/pdf`,
     exchanges: `${API_BASE_URL}/stocks/exchanges`,
+    job: (jobId) => `${API_BASE_URL}/stocks/jobs/${jobId}`,
+    events: `${API_BASE_URL}/stocks/events`,
 };
 
 const API_USER_ENDPOINTS = {
@@ -35,7 +35,50 @@ const api = {
   },
   pullStockStats: async (payload) => {
     const response = await axios.post(API_STOCK_ENDPOINTS.pullStockStats, payload, getRequestConfig());
-    return response.data.data;
+    return response.data;
+  },
+  fetchJob: async (jobId) => {
+    const response = await axios.get(API_STOCK_ENDPOINTS.job(jobId), getRequestConfig());
+    return response.data;
+  },
+  // EventSource can't send the Authorization header, so the stream is read with fetch.
+  // Calls onEvent(event, data) per event and resolves when the server closes the stream.
+  streamEvents: async (onEvent, signal) => {
+    const { headers } = getRequestConfig();
+    const response = await fetch(API_STOCK_ENDPOINTS.events, { headers, signal, credentials: 'include' });
+    if (!response.ok) {
+      // Shaped like an axios error so handleApiError sees 401s
+      const error = new Error(`Event stream failed with status ${response.status}`);
+      error.response = { status: response.status };
+      throw error;
+    }
+    const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+    let buffer = '';
+    for (;;) {
+      const { value, done } = await reader.read();
+      if (done) {
+        return;
+      }
+      buffer += value;
+      let end;
+      while ((end = buffer.indexOf('\n\n')) !== -1) {
+        const frame = buffer.slice(0, end);
+        buffer = buffer.slice(end + 2);
+        let event = 'message';
+        const data = [];
+        frame.split('\n').forEach((line) => {
+          if (line.startsWith('event:')) {
+            event = line.slice(6).trim();
+          } else if (line.startsWith('data:')) {
+            data.push(line.slice(5).trim());
+          }
+        });
+        // Comment lines (keepalives) and retry: hints carry no data
+        if (data.length) {
+          onEvent(event, JSON.parse(data.join('\n')));
+        }
+      }
+    }
   },
   removeStats: async (symbols) => {
     const response = await axios.post(API_STOCK_ENDPOINTS.removeStats, {
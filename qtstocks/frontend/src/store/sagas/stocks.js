@@ -1,3 +1,4 @@
+import { buffers, eventChannel } from 'redux-saga';
 import * as effects from 'redux-saga/effects';
 import {
   setStats,
@@ -31,6 +32,74 @@ import {
 } from '../actions/stocks';
 
 import api from '../apis/stocks';
+
+// Wait before reopening the event stream after it failed, e.g. a 503 when the server is at its stream cap
+const EVENT_STREAM_RETRY_MS = 2000;
+// Give up after 10 minutes without progress; the server fails jobs whose worker died well before that
+const JOB_IDLE_TIMEOUT_MS = 10 * 60 * 1000;
+
+const isJobRunning = (job) => job.status === 'queued' || job.status === 'running';
+
+// Channel of { event, data } from /stocks/events, ending with { event: 'closed', error }
+const createStockEventChannel = () => eventChannel((emit) => {
+  const controller = new AbortController();
+  api.streamEvents((event, data) => emit({ event, data }), controller.signal)
+    .then(() => emit({ event: 'closed', error: null }))
+    .catch((error) => {
+      if (!controller.signal.aborted) {
+        emit({ event: 'closed', error });
+      }
+    });
+  return () => controller.abort();
+}, buffers.expanding(16));
+
+// Follow a background job over the event stream until it finishes or stops making progress
+function* waitForJobSaga(jobId) {
+  let job = null;
+  let progress = -1;
+  let lastProgressAt = Date.now();
+  for (;;) {
+    const channel = yield effects.call(createStockEventChannel);
+    let streamError = null;
+    try {
+      // Re-read the job so events sent before the stream opened aren't missed
+      job = yield effects.call(api.fetchJob, jobId);
+      for (;;) {
+        if (job.done + job.failed !== progress) {
+          progress = job.done + job.failed;
+          lastProgressAt = Date.now();
+        }
+        if (!isJobRunning(job)) {
+          return job;
+        }
+        const idleLeft = JOB_IDLE_TIMEOUT_MS - (Date.now() - lastProgressAt);
+        if (idleLeft <= 0) {
+          throw new Error('Stock stats pull stopped making progress');
+        }
+        const { message } = yield effects.race({
+          message: effects.take(channel),
+          timeout: effects.delay(idleLeft),
+        });
+        if (message?.event === 'job' && message.data.id === jobId) {
+          job = message.data;
+        } else if (message?.event === 'closed') {
+          streamError = message.error;
+          break;
+        }
+      }
+    } finally {
+      channel.close();
+    }
+    if (streamError?.response?.status === 401) {
+      throw streamError;
+    }
+    // The server ends streams after a while, reconnect right away unless it failed
+    if (streamError) {
+      yield effects.delay(EVENT_STREAM_RETRY_MS);
+    }
+  }
+}
+
 // Sagas
 function* createPortfolioSaga(action) {
   try {
@@ -161,7 +230,12 @@ function* pullStockStatsSaga(action) {
       action: ErrorActions.STOCK_SELECTOR,
       message: '',
     }));
-    yield effects.call(api.pullStockStats, action.payload);
+    const { job_id: jobId } = yield effects.call(api.pullStockStats, action.payload);
+    // The pull runs in the background and reports progress over the event stream
+    const job = yield effects.call(waitForJobSaga, jobId);
+    if (job.status === 'failed') {
+      throw new Error(job.error || 'Stock stats pull failed');
+    }
     yield effects.call(fetchStatsSaga);
   } catch (error) {
     yield effects.put(setError({